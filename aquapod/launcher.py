@@ -0,0 +1,193 @@
+"""Runs PodBot as several processes, each with its own range of shards, so voice and extraction use every core.
+
+    python -m aquapod.launcher --processes 4
+
+Each process is a normal aquapod.main run with SHARD_IDS and SHARD_COUNT set, so a guild's state and
+controller channel live in the process that owns its shard. Processes report their health to the
+launcher over a local socket; the launcher restarts any that exit and sends back the totals shown in /stats.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+REPORT_INTERVAL = 5  # Seconds between totals sent to the processes; matches SHARD_REPORT_INTERVAL in main
+STALE_AFTER = 3 * REPORT_INTERVAL  # A process that has not reported for this long is left out of the totals
+IDENTIFY_INTERVAL = 5.5  # Discord allows one shard identify per 5 seconds per concurrency bucket
+RESTART_DELAY = 5  # Seconds before restarting a process that exited; doubles while it keeps failing
+RESTART_DELAY_MAX = 120
+TOTAL_FIELDS = ('guilds', 'voice_sessions', 'playing', 'guild_states', 'queued_tracks')
+
+logger = logging.getLogger('aquapod.launcher')
+
+
+def shard_ranges(shard_count: int, processes: int) -> list:
+    """Splits shards 0..shard_count-1 into `processes` contiguous ranges whose sizes differ by at most one."""
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for idx in range(processes):
+        size = base + (idx < extra)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def process_env(index: int, shard_ids: list, shard_count: int, processes: int, coordinator: str, base_env=None) -> dict:
+    """The environment of one shard process. Per-process resources are split so the processes do not share them."""
+    env = dict(os.environ if base_env is None else base_env)
+    env.update({
+        'SHARD_IDS': ','.join(map(str, shard_ids)),
+        'SHARD_COUNT': str(shard_count),
+        'SHARD_PROCESS': str(index),
+        'SHARD_COORDINATOR': coordinator,
+        'LOG_FILE': f'discord-{index}.log'
+    })
+    # Each process serves its own metrics, on consecutive ports
+    metrics_port = int(env.get('METRICS_PORT', '9108'))
+    if metrics_port:
+        env['METRICS_PORT'] = str(metrics_port + index)
+    # Each process indexes and evicts its own audio cache, so they get separate directories
+    if env.get('AUDIO_CACHE_DIR'):
+        env['AUDIO_CACHE_DIR'] = os.path.join(env['AUDIO_CACHE_DIR'], f'process-{index}')
+        env['AUDIO_CACHE_MAX_MB'] = str(max(int(env.get('AUDIO_CACHE_MAX_MB', '2048')) // processes, 1))
+    if env.get('EXTRACTION_BACKEND', 'thread').lower() == 'process' and not env.get('EXTRACTION_WORKERS'):
+        env['EXTRACTION_WORKERS'] = str(max((os.cpu_count() or 1) // processes, 1))
+    return env
+
+
+async def fetch_gateway(token: str) -> dict:
+    """Returns Discord's recommended shard count and identify concurrency for the bot."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v10/gateway/bot', headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+class Coordinator:
+    """Collects health reports from the shard processes and sends every process the totals across all of them."""
+    def __init__(self, processes: int, interval: float = REPORT_INTERVAL, stale_after: float = STALE_AFTER):
+        self.processes = processes
+        self.interval = interval
+        self.stale_after = stale_after
+        self.reports = {}  # Process index -> (received at, latest report)
+        self.writers = set()
+        self.stale = set()
+        self.server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self.server = await asyncio.start_server(self.handle, host, port)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f'{host}:{port}'
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writers.add(writer)
+        try:
+            while line := await reader.readline():
+                report = json.loads(line)
+                self.reports[report['process']] = (time.monotonic(), report)
+        except (ConnectionError, ValueError, KeyError) as e:
+            logger.warning(f"Dropped a shard process connection: {e}")
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def totals(self, now: float) -> dict:
+        fresh = [report for received_at, report in self.reports.values() if now - received_at < self.stale_after]
+        totals = {'processes': self.processes, 'reporting': len(fresh)}
+        for key in TOTAL_FIELDS:
+            totals[key] = sum(report[key] for report in fresh)
+        return totals
+
+    def check_health(self, now: float):
+        for index in range(self.processes):
+            received_at, report = self.reports.get(index, (None, None))
+            stale = received_at is None or now - received_at >= self.stale_after
+            if stale and index not in self.stale and received_at is not None:
+                logger.warning(f"Process {index} has not reported for {now - received_at:.0f}s")
+            elif not stale and index in self.stale:
+                logger.info(f"Process {index} is reporting again, latency {report['latency_ms']}ms")
+            if stale:
+                self.stale.add(index)
+            else:
+                self.stale.discard(index)
+
+    async def broadcast(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.check_health(now)
+            line = json.dumps(self.totals(now)).encode() + b'\n'
+            for writer in list(self.writers):
+                writer.write(line)
+
+
+async def supervise(index: int, env: dict):
+    """Runs one shard process, restarting it whenever it exits."""
+    delay = RESTART_DELAY
+    while True:
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(sys.executable, '-m', 'aquapod.main', env=env)
+        logger.info(f"Started process {index} (pid {process.pid}) for shards {env['SHARD_IDS']}")
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            # SIGINT lets the bot close cleanly and save its state
+            process.send_signal(signal.SIGINT if os.name != 'nt' else signal.SIGTERM)
+            await process.wait()
+            raise
+        if time.monotonic() - started > RESTART_DELAY_MAX:
+            delay = RESTART_DELAY
+        logger.warning(f"Process {index} exited with code {code}, restarting in {delay}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RESTART_DELAY_MAX)
+
+
+async def launch(processes: int, shard_count: int = None):
+    token = os.getenv('DISCORD_BOT_TOKEN')
+    max_concurrency = 1
+    if shard_count is None:
+        gateway = await fetch_gateway(token)
+        shard_count = gateway['shards']
+        max_concurrency = gateway['session_start_limit']['max_concurrency']
+    # A process per shard at most; more shards than Discord recommends is allowed
+    shard_count = max(shard_count, processes)
+
+    coordinator = Coordinator(processes)
+    address = await coordinator.start()
+    logger.info(f"Running {shard_count} shards in {processes} processes, coordinating on {address}")
+    broadcast = asyncio.create_task(coordinator.broadcast())
+    supervisors = []
+    for index, shard_ids in enumerate(shard_ranges(shard_count, processes)):
+        supervisors.append(asyncio.create_task(supervise(index, process_env(index, shard_ids, shard_count, processes, address))))
+        # Stagger processes so their shards do not identify with Discord at the same time
+        await asyncio.sleep(-(-len(shard_ids) // max_concurrency) * IDENTIFY_INTERVAL)
+    try:
+        await asyncio.gather(*supervisors)
+    finally:
+        broadcast.cancel()
+        coordinator.server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Bot processes to run (defaults to the CPU count)")
+    parser.add_argument('--shards', type=int, help="Total shards (defaults to Discord's recommendation)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+    try:
+        asyncio.run(launch(args.processes, args.shards))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,634 @@
 import os
+import re
 import logging
+import atexit
+import bisect
 import threading
 import keyboard
 from dotenv import load_dotenv
 import yt_dlp
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+import math
+import sqlite3
+import json
+import multiprocessing
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from itertools import islice
+from queue import SimpleQueue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 import discord
+import spotipy
+from aiohttp import web
 from discord import app_commands
 from discord.ext import commands
+from spotipy.oauth2 import SpotifyClientCredentials
+
+# get tokens from .env
+load_dotenv()
 
 # logging
-logging.basicConfig(level=logging.INFO)
+# Records are only queued on the calling thread; a listener thread formats them and does the file
+# and console I/O, so logging never blocks the event loop or the voice threads.
+LOG_MAX_MB = int(os.getenv('LOG_MAX_MB', '10'))  # discord.log is rotated at this size
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '5'))  # Rotated log files kept
+log_queue = SimpleQueue()
+# The shard launcher gives each process its own log file
+file_handler = RotatingFileHandler(
+    os.getenv('LOG_FILE', 'discord.log'), maxBytes=LOG_MAX_MB * 1024 * 1024, backupCount=LOG_BACKUPS, encoding='utf-8'
+)
+file_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+file_handler.addFilter(logging.Filter('discord'))
+log_listener = QueueListener(log_queue, logging.StreamHandler(), file_handler)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
 logger = logging.getLogger('discord')
 logger.setLevel(logging.DEBUG)
-handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
-handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-logger.addHandler(handler)
-
-# get tokens from .env
-load_dotenv()
+log_listener.start()
+atexit.register(log_listener.stop)
 
 DISCORD_BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 SHOULD_SYNC = os.getenv('SHOULD_SYNC', 'false').lower() == 'true'
+PLAYLIST_CONCURRENCY = int(os.getenv('PLAYLIST_CONCURRENCY', '8'))  # Playlist entries resolved at once
+PLAYLIST_ENTRY_TIMEOUT = float(os.getenv('PLAYLIST_ENTRY_TIMEOUT', '60'))  # Seconds before an entry is skipped
+PLAYLIST_PROGRESS_INTERVAL = 2.0  # Minimum seconds between playlist progress updates
+PLAYLIST_STREAMING = os.getenv('PLAYLIST_STREAMING', 'true').lower() == 'true'  # Load playlists page by page instead of all at once
+PLAYLIST_PAGE_SIZE = 50  # Entries handed over at a time by a streamed playlist
+PLAYLIST_WINDOW = int(os.getenv('PLAYLIST_WINDOW', '200'))  # A streamed playlist stops loading while this many tracks are queued
+PREFETCH_LEAD_SECONDS = float(os.getenv('PREFETCH_LEAD_SECONDS', '30'))  # Start the next track's FFmpeg this long before the current one ends
+PREFETCH_URL_MAX_AGE = 3600  # Seconds before a prefetched stream URL is resolved again
+STREAM_RETRY_LIMIT = int(os.getenv('STREAM_RETRY_LIMIT', '3'))  # Reconnects per track before moving on to the next one
+STREAM_END_TOLERANCE = 15  # A track ending further than this from its duration is treated as a dropped stream
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))  # Videos kept in the extraction cache
+CACHE_METADATA_TTL = float(os.getenv('CACHE_METADATA_TTL', '86400'))  # Seconds titles and durations are kept
+STREAM_URL_TTL = 3600  # Seconds a stream URL is trusted when it carries no expire parameter
+STREAM_URL_MARGIN = 600  # Stream URLs this close to expiring are resolved again
+QUEUE_RENDER_INTERVAL = float(os.getenv('QUEUE_RENDER_INTERVAL', '2'))  # Minimum seconds between queue message edits
+STARTUP_CONCURRENCY = int(os.getenv('STARTUP_CONCURRENCY', '10'))  # Guilds set up at once on startup
+FIRST_AUDIO_TARGET_P50 = float(os.getenv('FIRST_AUDIO_TARGET_P50', '2'))  # Seconds from /play to audio for the median request
+FIRST_AUDIO_TARGET_P95 = float(os.getenv('FIRST_AUDIO_TARGET_P95', '5'))  # Seconds from /play to audio for the 95th percentile
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'aquapod.db')  # SQLite file queues are saved to; empty disables saving
+STATE_FLUSH_INTERVAL = 1.0  # Minimum seconds between writes of changed guild state
+POSITION_CHECKPOINT_INTERVAL = float(os.getenv('POSITION_CHECKPOINT_INTERVAL', '15'))  # Seconds between saves of the playback position
+RESUME_MIN_DURATION = 600  # Only tracks at least this long resume where they stopped
+RESUME_REWIND_SECONDS = 5  # Resumed tracks start this much before the saved position
+TRACK_INDEX_PATH = os.getenv('TRACK_INDEX_PATH', STATE_DB_PATH)  # SQLite file of resolved tracks searched by /play; empty disables it
+AUTOCOMPLETE_TIMEOUT = 1.5  # Seconds an autocomplete lookup may take; Discord gives up after 3
+AUTOCOMPLETE_CHOICES = 25  # The most choices Discord shows
+SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')  # Spotify links are only accepted when both are set
+SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
+SPOTIFY_API_URL = os.getenv('SPOTIFY_API_URL', 'https://api.spotify.com/v1/')  # Overridden to point at a stand-in in tests and benchmarks
+SPOTIFY_MARKET = os.getenv('SPOTIFY_MARKET', 'US')  # Shows and episodes are only returned for a market
+SPOTIFY_MATCH_CONCURRENCY = int(os.getenv('SPOTIFY_MATCH_CONCURRENCY', '8'))  # YouTube searches run at once for a Spotify import
+SPOTIFY_PAGE_CONCURRENCY = 4  # Spotify pages fetched at once after the first
+SPOTIFY_PAGE_SIZES = {'show': 50, 'playlist': 100}  # The largest page each endpoint serves
+SPOTIFY_SEARCH_RESULTS = 3  # YouTube results compared against a Spotify item's length
+SPOTIFY_DURATION_TOLERANCE = 0.1  # A result within this fraction of the item's length (or 30s) counts as the same recording
+PLAYBACK_MODE = os.getenv('PLAYBACK_MODE', 'opus').lower()  # 'opus' sends Opus straight to Discord, 'pcm' has discord.py encode it
+AUDIO_BITRATE = int(os.getenv('AUDIO_BITRATE', '128'))  # kbps FFmpeg encodes at when the source is not already Opus
+
+# yt-dlp format selection for each playback mode. In 'opus' mode YouTube's Opus/WebM audio is
+# preferred, so FFmpeg only has to copy packets instead of decoding and re-encoding them.
+AUDIO_FORMATS = {
+    'opus': 'bestaudio[acodec=opus]/bestaudio/best',
+    'pcm': 'bestaudio/best'
+}
+if PLAYBACK_MODE not in AUDIO_FORMATS:
+    raise ValueError(f"PLAYBACK_MODE must be one of: {', '.join(AUDIO_FORMATS)}")
+
+# FFmpeg input options for streams over HTTP. Stalled reads time out after 15s instead of hanging.
+FFMPEG_STREAM_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_on_network_error 1 -reconnect_delay_max 5 -rw_timeout 15000000'
+# Live streams reconnect sooner, since a long gap falls behind the live edge
+FFMPEG_LIVE_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_on_network_error 1 -reconnect_delay_max 2 -rw_timeout 10000000'
+# HLS playlists start a few segments behind the live edge so there is a buffer to ride out slow segments
+FFMPEG_HLS_OPTIONS = '-live_start_index -3'
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', '')  # Directory played audio is kept in for replays; empty disables it
+AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', '2048'))  # Total size of the audio cache
+AUDIO_CACHE_DOWNLOADS = 2  # Videos downloaded into the audio cache at once
+EXTRACTION_BACKEND = os.getenv('EXTRACTION_BACKEND', 'thread').lower()  # 'process' runs yt-dlp in worker processes, off the bot's GIL
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 4)))  # Worker processes for the 'process' backend
+if EXTRACTION_BACKEND not in ('thread', 'process'):
+    raise ValueError("EXTRACTION_BACKEND must be one of: thread, process")
+EXTRACTION_THREADS = int(os.getenv('EXTRACTION_THREADS', str(min(32, (os.cpu_count() or 1) + 4))))  # Extractions run at once with the 'thread' backend
+VOICE_IDLE_TIMEOUT = float(os.getenv('VOICE_IDLE_TIMEOUT', '300'))  # Seconds connected without playing before leaving voice; 0 never leaves
+VOICE_ALONE_TIMEOUT = float(os.getenv('VOICE_ALONE_TIMEOUT', '60'))  # Seconds connected with no listeners before leaving voice; 0 never leaves
+GUILD_STATE_TTL = float(os.getenv('GUILD_STATE_TTL', '3600'))  # Seconds an untouched guild's state is kept in memory; 0 keeps it forever
+MAX_QUEUE_LENGTH = int(os.getenv('MAX_QUEUE_LENGTH', '5000'))  # Tracks a guild can queue
+MAX_TITLE_LENGTH = 200  # Longer track titles are cut to this many characters
+RECLAIM_INTERVAL = 30  # Seconds between checks for idle voice connections and cold guild state
+
+# Set by aquapod.launcher for each process it starts. Without them, one process runs every shard Discord recommends.
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id] or None
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None
+SHARD_PROCESS = int(os.getenv('SHARD_PROCESS', '0'))  # This process's index among the launcher's processes
+SHARD_COORDINATOR = os.getenv('SHARD_COORDINATOR', '')  # host:port the launcher collects health reports on
+SHARD_REPORT_INTERVAL = 5  # Seconds between health reports to the launcher
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Address the Prometheus endpoint listens on
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))  # Port of the Prometheus endpoint at /metrics; 0 disables it
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event-loop lag samples
 
 intents = discord.Intents.default()
 intents.message_content = True
 
-executor = ThreadPoolExecutor()
+# Runs yt-dlp; replaced by a process pool by start_extraction_workers with the 'process' backend
+executor = ThreadPoolExecutor(EXTRACTION_THREADS)
+
+class ExtractionCache:
+    """Shares yt-dlp results across guilds, keyed by video id.
+
+    Metadata is kept for `metadata_ttl` seconds, stream URLs until the `expire` time embedded
+    in them. The least recently used video is evicted once `max_entries` is reached, and
+    concurrent lookups for the same video share a single extraction. `waiting` holds the guilds
+    waiting on each shared extraction, so one guild cancelling its jobs does not fail the others.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, metadata_ttl: float = CACHE_METADATA_TTL):
+        self.max_entries = max_entries
+        self.metadata_ttl = metadata_ttl
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.waiting = {}  # Key -> guild ids waiting on its in-flight extraction
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'deduplicated': 0}
+
+    @staticmethod
+    def key_for(video_url: str) -> str:
+        match = re.search(r'(?:[?&]v=|youtu\.be/|/shorts/|/live/|/embed/)([\w-]{11})', video_url)
+        return match.group(1) if match else video_url
+
+    @staticmethod
+    def stream_expiry(stream_url: str, now: float) -> float:
+        """Reads the expiry from a googlevideo URL, either `expire=` or `/expire/` for HLS manifests."""
+        match = re.search(r'[?&/]expire[=/](\d+)', stream_url)
+        return float(match.group(1)) if match else now + STREAM_URL_TTL
+
+    async def get(self, video_url: str, extract, need_stream: bool = False, guild_id: int = None):
+        """Returns cached info for `video_url`, awaiting `extract()` on a miss.
+
+        With `need_stream`, the entry only counts as a hit while its stream URL is still valid.
+        `guild_id` is the guild asking; `waiters(video_url)` gives every guild asking while it runs.
+        """
+        key = self.key_for(video_url)
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry:
+            if now - entry['stored_at'] >= self.metadata_ttl:
+                del self.entries[key]
+            elif not need_stream or (entry['info'].get('url') and entry['stream_expires'] - now > STREAM_URL_MARGIN):
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['info']
+
+        if key in self.in_flight:
+            self.stats['deduplicated'] += 1
+            self.waiting[key].add(guild_id)
+        else:
+            self.stats['misses'] += 1
+            self.waiting[key] = {guild_id}
+            self.in_flight[key] = asyncio.create_task(self._extract(key, extract))
+            # Retrieve failures nobody is left waiting for, such as jobs dropped by a cancelled guild
+            self.in_flight[key].add_done_callback(lambda task: task.cancelled() or task.exception())
+        # Shielded so one caller timing out does not cancel the extraction for the others
+        return await asyncio.shield(self.in_flight[key])
+
+    async def _extract(self, key, extract):
+        try:
+            info = await extract()
+        finally:
+            del self.in_flight[key]
+            del self.waiting[key]
+        if info:
+            self.put(key, info)
+        return info
+
+    def waiters(self, video_url: str) -> set | None:
+        """The live set of guilds waiting on the in-flight extraction of `video_url`."""
+        return self.waiting.get(self.key_for(video_url))
+
+    def invalidate_stream(self, video_url: str):
+        """Forces the next stream lookup for `video_url` to resolve a fresh URL, keeping the metadata."""
+        entry = self.entries.get(self.key_for(video_url))
+        if entry:
+            entry['stream_expires'] = 0
+
+    def put(self, key: str, info: dict):
+        now = time.time()
+        self.entries[key] = {
+            'info': info,
+            'stored_at': now,
+            'stream_expires': self.stream_expiry(info['url'], now) if info.get('url') else now
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+extraction_cache = ExtractionCache()
+
+class ExtractionCancelled(Exception):
+    """Raised to callers whose waiting extraction job was dropped by `ExtractionScheduler.cancel`."""
+
+class ExtractionScheduler:
+    """Decides which extraction runs next, so the executor is never handed more than it can run at once.
+
+    Jobs run strictly by priority: the track about to play, then interactive /play lookups, then
+    playlist backfill. Within a priority guilds take turns, so one guild's huge playlist cannot
+    hold up another guild's requests.
+    """
+    NOW, INTERACTIVE, BACKFILL = range(3)
+
+    def __init__(self, concurrency: int = EXTRACTION_THREADS):
+        self.concurrency = concurrency
+        self.running = 0
+        # One per priority: guild id to its waiting jobs, with the guild whose turn is next first
+        self.queues = [OrderedDict() for _ in range(3)]
+        self.guild_stats = {}
+
+    async def run(self, guild_id, priority: int, function, *args, waiting: set = None):
+        """Runs `function(*args)` on the extraction executor once it is this job's turn.
+
+        `waiting` is the set of guilds that need the result, when it is shared through the extraction cache.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = (future, guild_id, function, args, loop.time(), {guild_id} if waiting is None else waiting)
+        self.queues[priority].setdefault(guild_id, deque()).append(job)
+        self.stats_for(guild_id)['submitted'] += 1
+        self.dispatch()
+        return await future
+
+    def stats_for(self, guild_id) -> dict:
+        if guild_id not in self.guild_stats:
+            self.guild_stats[guild_id] = {'submitted': 0, 'cancelled': 0, 'waits': deque(maxlen=100)}
+        return self.guild_stats[guild_id]
+
+    def next_job(self):
+        for queue in self.queues:
+            while queue:
+                guild_id, jobs = queue.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    queue[guild_id] = jobs  # Back of the line for this guild's next job
+                if not job[0].done():  # Skip jobs whose caller already gave up
+                    return job
+        return None
+
+    def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.running < self.concurrency:
+            job = self.next_job()
+            if job is None:
+                return
+            future, guild_id, function, args, queued_at, _ = job
+            self.stats_for(guild_id)['waits'].append(loop.time() - queued_at)
+            self.running += 1
+            task = loop.run_in_executor(executor, function, *args)
+            task.add_done_callback(lambda task, future=future, args=args, started=loop.time(): self.finished(task, future, args, started))
+
+    def finished(self, task, future, args=(), started=None):
+        self.running -= 1
+        if started is not None and args:
+            extraction_seconds.observe(asyncio.get_running_loop().time() - started, args[0])  # Labelled by extraction kind
+        if task.cancelled():
+            future.cancel()
+        elif not future.done():
+            if task.exception():
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self.dispatch()
+
+    def cancel(self, guild_id, priorities=(NOW, INTERACTIVE, BACKFILL)) -> int:
+        """Drops the guild's waiting jobs at `priorities`; jobs already running finish but nobody waits for them.
+
+        A job another guild also waits on is handed to that guild instead of being dropped.
+        """
+        dropped = 0
+        for priority in priorities:
+            queue = self.queues[priority]
+            for future, _, function, args, queued_at, waiting in queue.pop(guild_id, ()):
+                if future.done():
+                    continue
+                waiting.discard(guild_id)
+                if waiting:
+                    other = next(iter(waiting))
+                    queue.setdefault(other, deque()).append((future, other, function, args, queued_at, waiting))
+                else:
+                    future.set_exception(ExtractionCancelled())
+                    dropped += 1
+        if dropped:
+            self.stats_for(guild_id)['cancelled'] += dropped
+            logger.info(f"Dropped {dropped} waiting extractions in guild {guild_id}")
+        return dropped
+
+    def depth(self, guild_id) -> int:
+        """How many of the guild's jobs are waiting to run."""
+        return sum(len(queue.get(guild_id, ())) for queue in self.queues)
+
+extraction_scheduler = ExtractionScheduler()
+
+class AudioCache:
+    """Keeps played audio on disk as Opus files keyed by video id, so replays skip YouTube.
+
+    A video is downloaded in the background the first time it is played and only becomes visible
+    once complete: FFmpeg writes to a `.part` file that is renamed into place. Files are evicted
+    least recently used first once the cache exceeds `max_bytes`; a file being played when it is
+    evicted stays readable until FFmpeg closes it.
+    """
+    SUFFIX = '.opus'
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()  # Video id to file size, least recently used first
+        self.total_bytes = 0
+        self.in_flight = {}
+        self.semaphore = asyncio.Semaphore(AUDIO_CACHE_DOWNLOADS)
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evictions': 0, 'failures': 0}
+        if directory and os.path.isdir(directory):
+            self.scan()
+
+    def scan(self):
+        """Indexes files left by a previous run, oldest access first, and drops unfinished downloads."""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.part'):
+                os.remove(entry.path)
+            elif entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(self.SUFFIX)], stat.st_size))
+        for _, video_id, size in sorted(found):
+            self.files[video_id] = size
+            self.total_bytes += size
+        self.evict()
+
+    def path_for(self, video_id: str) -> str:
+        return os.path.join(self.directory, video_id + self.SUFFIX)
+
+    def lookup(self, video_id: str | None):
+        """Returns the cached file for a video, or None if it is not cached yet."""
+        if not self.directory or not video_id:
+            return None
+        if video_id not in self.files:
+            self.stats['misses'] += 1
+            return None
+        path = self.path_for(video_id)
+        try:
+            os.utime(path)  # Keeps the recency across restarts
+        except FileNotFoundError:
+            self.total_bytes -= self.files.pop(video_id)
+            self.stats['misses'] += 1
+            return None
+        self.files.move_to_end(video_id)
+        self.stats['hits'] += 1
+        return path
+
+    def fill(self, pod: 'Track', stream: dict):
+        """Starts downloading a track that is being played from YouTube, if it is worth keeping."""
+        if not self.directory or not pod.id or pod.is_live or not pod.duration or pod.id in self.in_flight:
+            return
+        # Skip episodes that would take up more than half of the cache on their own
+        if pod.duration * AUDIO_BITRATE * 1000 / 8 > self.max_bytes / 2:
+            return
+        task = asyncio.create_task(self.download(pod.id, stream))
+        self.in_flight[pod.id] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(pod.id, None))
+
+    async def download(self, video_id: str, stream: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        partial = self.path_for(video_id) + '.part'
+        codec = ['-c:a', 'copy'] if stream.get('acodec') == 'opus' else ['-c:a', 'libopus', '-b:a', f'{AUDIO_BITRATE}k']
+        async with self.semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+                    *FFMPEG_STREAM_OPTIONS.split(),
+                    '-i', stream['url'], '-vn', '-map_metadata', '-1', *codec, '-f', 'opus', partial,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+                )
+            except OSError as e:
+                self.stats['failures'] += 1
+                logger.warning(f"Failed to start FFmpeg to cache audio for {video_id}: {e}")
+                return
+            try:
+                _, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            finally:
+                if process.returncode != 0 and os.path.exists(partial):
+                    os.remove(partial)
+        if process.returncode != 0:
+            self.stats['failures'] += 1
+            logger.warning(f"Failed to cache audio for {video_id}: {stderr.decode(errors='replace').strip()}")
+            return
+        self.commit(video_id, partial)
+
+    def commit(self, video_id: str, partial: str):
+        """Moves a finished download into place and evicts old files to stay within the size cap."""
+        path = self.path_for(video_id)
+        os.replace(partial, path)
+        if video_id in self.files:
+            self.total_bytes -= self.files.pop(video_id)
+        self.files[video_id] = os.path.getsize(path)
+        self.total_bytes += self.files[video_id]
+        self.stats['stored'] += 1
+        logger.info(f"Cached audio for {video_id} ({self.files[video_id] / 1024 / 1024:.1f} MB)")
+        self.evict()
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.files:
+            video_id, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self.path_for(video_id))
+            except FileNotFoundError:
+                pass
+
+audio_cache = AudioCache()
+
+# Queue message updates requested versus edits actually sent to Discord
+render_stats = {'requested': 0, 'sent': 0, 'unchanged': 0}
+
+# How audio sources were opened: Opus copied through, transcoded to Opus by FFmpeg, or decoded to PCM
+source_stats = {'copy': 0, 'transcode': 0, 'pcm': 0}
+
+# Time between one track ending and the next one producing audio
+playback_stats = {
+    'transitions': 0,
+    'prefetched': 0,
+    'recent_gaps': deque(maxlen=100)
+}
+
+# Streams that dropped mid-track and were resolved again, and how long until audio resumed
+recovery_stats = {
+    'attempts': 0,
+    'recovered': 0,
+    'gave_up': 0,
+    'recent_latency': deque(maxlen=100)
+}
+
+# Time from a /play request to its first audio packet
+first_audio_stats = {
+    'requests': 0,
+    'over_target': 0,
+    'recent': deque(maxlen=500)
+}
+
+# Voice connections closed for inactivity, and guild states dropped from memory
+reclaim_stats = {'idle_disconnects': 0, 'alone_disconnects': 0, 'evictions': 0}
+
+# Spotify items imported, and whether each one's YouTube match came from the saved matches or a search
+spotify_stats = {'imports': 0, 'items': 0, 'cached': 0, 'searched': 0, 'unmatched': 0}
+
+def percentile(values, fraction: float):
+    """Returns the value below which `fraction` of `values` fall, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+# Bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+metrics = []  # Everything served at /metrics, in order
+
+class Counter:
+    """A Prometheus counter, one value per combination of `labels`."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+        metrics.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+class Histogram:
+    """A Prometheus histogram. Observing is a bisect and two additions, cheap enough for the playback path."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # Label values -> [count per bucket..., count above the last bucket, sum]
+        metrics.append(self)
+
+    def observe(self, value: float, *label_values):
+        counts = self.values.get(label_values)
+        if counts is None:
+            counts = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        for label_values, counts in self.values.items():
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': str(bound)}, cumulative
+            yield f'{self.name}_sum', labels, counts[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+class Collected:
+    """A gauge or counter read when /metrics is scraped. `collect()` returns a value, or a dict of label values to values."""
+    def __init__(self, name: str, documentation: str, collect, kind: str = 'gauge', labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.kind = kind
+        self.labels = labels
+        metrics.append(self)
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_metrics() -> str:
+    """Formats every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            label_text = ','.join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+extraction_seconds = Histogram('aquapod_extraction_seconds', "Time yt-dlp spent on one extraction", labels=('kind',))
+first_audio_seconds = Histogram('aquapod_first_audio_seconds', "Time from a /play request to its first audio packet")
+track_gap_seconds = Histogram('aquapod_track_gap_seconds', "Time from one track ending to the next one producing audio", labels=('next',))
+ffmpeg_spawn_seconds = Histogram('aquapod_ffmpeg_spawn_seconds', "Time taken to start an FFmpeg process", labels=('mode',))
+loop_lag_seconds = Histogram('aquapod_event_loop_lag_seconds', "How late the event loop ran a scheduled callback", buckets=LAG_BUCKETS)
+autocomplete_seconds = Histogram('aquapod_autocomplete_seconds', "Time taken to answer a /play autocomplete", buckets=LAG_BUCKETS)
+rate_limits = Counter('aquapod_discord_rate_limits_total', "Discord API requests that were rate limited", labels=('scope',))
+Collected('aquapod_voice_sessions', "Voice channels the bot is connected to", lambda: len(bot.voice_clients))
+Collected(
+    'aquapod_active_players', "Voice connections currently playing audio",
+    lambda: sum(1 for voice_client in bot.voice_clients if voice_client.is_playing())
+)
+Collected('aquapod_guild_states', "Guild states held in memory", lambda: len(bot.guild_data))
+Collected(
+    'aquapod_queue_length', "Tracks queued per guild, for guilds with a non-empty queue",
+    lambda: {(guild_id,): len(guild_data.pod_queue) for guild_id, guild_data in bot.guild_data.items() if guild_data.pod_queue},
+    labels=('guild',)
+)
+Collected(
+    'aquapod_queue_message_updates_total', "Queue message updates requested, edits sent and edits skipped as unchanged",
+    lambda: {(result,): count for result, count in render_stats.items()}, kind='counter', labels=('result',)
+)
+
+class RateLimitCounter(logging.Filter):
+    """Counts the 429 responses discord.py logs; it does not expose them any other way."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = str(record.msg)
+        if message.startswith('We are being rate limited'):
+            rate_limits.inc('route')
+        elif message.startswith('Global rate limit has been hit'):
+            rate_limits.inc('global')
+        return True
+
+logging.getLogger('discord.http').addFilter(RateLimitCounter())
+
+async def serve_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type='text/plain')
+
+async def start_metrics_server() -> web.AppRunner:
+    """Serves /metrics for Prometheus on METRICS_HOST:METRICS_PORT."""
+    app = web.Application()
+    app.router.add_get('/metrics', serve_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    logger.info(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """Measures how much later than scheduled a sleep on the event loop wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        loop_lag_seconds.observe(max(loop.time() - expected, 0))
 
 # Colors for terminal messages
 class bcolors:
@@ -44,26 +644,562 @@ class bcolors:
     UNDERLINE = '\033[4m'
     DEFAULT = '\033[99m'
 
+@dataclass(slots=True)
+class Track:
+    """A queued video. Only the stable page URL is kept; stream URLs are resolved at play time.
+
+    `start_at` is the offset in seconds playback starts from, set when an interrupted episode is restored.
+    """
+    name: str
+    url: str
+    id: str | None = None
+    duration: float | None = None
+    is_live: bool = False
+    start_at: float = 0.0
+
+    @classmethod
+    def from_info(cls, video_info: dict, video_url: str) -> 'Track':
+        name = video_info.get('title') or 'Unknown Title'
+        if len(name) > MAX_TITLE_LENGTH:
+            name = name[:MAX_TITLE_LENGTH - 1] + '…'
+        return cls(
+            name=name,
+            url=video_info.get('webpage_url') or video_url,
+            id=video_info.get('id'),
+            duration=video_info.get('duration'),
+            is_live=video_info.get('is_live') or False
+        )
+
+class QueueFull(Exception):
+    """Raised when a track is added to a queue that already holds its maximum number of tracks."""
+
+class TrackQueue:
+    """A guild's upcoming tracks, backed by a deque so taking the next track is O(1).
+
+    Indexes are 0-based; the queue commands convert from the 1-based positions users see.
+    Only `append` enforces `max_length`; tracks restored or put back at the front are never dropped.
+    """
+    __slots__ = ('tracks', 'max_length')
+
+    def __init__(self, tracks=(), max_length: int | None = None):
+        self.tracks = deque(tracks)
+        self.max_length = max_length
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def __getitem__(self, index: int) -> Track:
+        return self.tracks[index]
+
+    def append(self, track: Track):
+        if self.max_length is not None and len(self.tracks) >= self.max_length:
+            raise QueueFull(self.max_length)
+        self.tracks.append(track)
+
+    def appendleft(self, track: Track):
+        self.tracks.appendleft(track)
+
+    def extend(self, tracks):
+        self.tracks.extend(tracks)
+
+    def popleft(self) -> Track:
+        return self.tracks.popleft()
+
+    def clear(self):
+        self.tracks.clear()
+
+    def peek(self, count: int) -> list:
+        """Returns the next `count` tracks without copying the rest of the queue."""
+        return list(islice(self.tracks, count))
+
+    def remove(self, index: int) -> Track:
+        track = self.tracks[index]
+        del self.tracks[index]
+        return track
+
+    def move(self, source: int, destination: int) -> Track:
+        track = self.remove(source)
+        self.tracks.insert(destination, track)
+        return track
+
+    def shuffle(self):
+        tracks = list(self.tracks)
+        random.shuffle(tracks)
+        self.tracks = deque(tracks)
+
+    def dedupe(self) -> int:
+        """Drops repeated videos, keeping the first occurrence. Returns how many were removed."""
+        seen = set()
+        kept = []
+        for track in self.tracks:
+            key = track.id or track.url
+            if key not in seen:
+                seen.add(key)
+                kept.append(track)
+        removed = len(self.tracks) - len(kept)
+        self.tracks = deque(kept)
+        return removed
+
+def ready_event() -> asyncio.Event:
+    event = asyncio.Event()
+    event.set()
+    return event
+
+def guild_queue() -> TrackQueue:
+    return TrackQueue(max_length=MAX_QUEUE_LENGTH)
+
+@dataclass
+class GuildState:
+    """Playback state for one guild. `ready` is cleared while its controller channel is being set up."""
+    guild_id: int | None = None
+    pod_queue: TrackQueue = field(default_factory=guild_queue)
+    current_pod: Track | None = None
+    queue_message: discord.Message | None = None
+    assigned_channel_id: int | None = None
+    prefetch: dict | None = None
+    renderer: 'QueueRenderer | None' = None
+    control_view: 'ControlButtons | None' = None
+    audio: 'TrackedAudio | None' = None
+    restored: bool = False
+    playlist_tasks: set = field(default_factory=set)
+    queue_space: asyncio.Event = field(default_factory=asyncio.Event)  # Set whenever a track leaves the queue
+    stream_retries: int = 0  # Reconnects of the current track's stream
+    ready: asyncio.Event = field(default_factory=ready_event)
+    last_active: float = field(default_factory=time.monotonic)  # When the state was last looked up
+    voice_idle_since: float | None = None  # When the voice connection was first seen idle or alone
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id INTEGER PRIMARY KEY,
+    assigned_channel_id INTEGER,
+    queue_message_id INTEGER,
+    position REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    guild_id INTEGER NOT NULL,
+    slot INTEGER NOT NULL,  -- 0 is the track that was playing, the queue starts at 1
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    video_id TEXT,
+    duration REAL,
+    is_live INTEGER NOT NULL,
+    start_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, slot)
+);
+"""
+
+class StateStore:
+    """Saves each guild's channel, current track and queue to SQLite so a restart picks up where it left off.
+
+    Mutations only mark a guild dirty; dirty guilds are written together at most once per `interval`,
+    in one transaction on a dedicated thread, so the event loop never waits on disk. The database is
+    in WAL mode, so a crash loses at most the last interval of changes.
+    """
+    def __init__(self, path: str = STATE_DB_PATH, interval: float = STATE_FLUSH_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.dirty = set()
+        self.positions = set()
+        self.task = None
+        self.connection = None
+        # sqlite3 connections must stay on the thread that opened them
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-store')
+        self.stats = {'flushes': 0, 'guilds_written': 0, 'positions_written': 0}
+
+    def mark_dirty(self, guild_id: int):
+        """Schedules a write of the guild's whole state."""
+        if self.path:
+            self.dirty.add(guild_id)
+            self.schedule()
+
+    def mark_position(self, guild_id: int):
+        """Schedules a write of only the playback position of the guild's current track."""
+        if self.path:
+            self.positions.add(guild_id)
+            self.schedule()
+
+    def schedule(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while self.dirty or self.positions:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    @staticmethod
+    def snapshot(guild_id: int, guild_data: 'GuildState'):
+        """Returns the guild's row and track rows; taken on the event loop so the writer sees a consistent state."""
+        position = guild_data.audio.position if guild_data.current_pod and guild_data.audio else 0
+        queue_message_id = guild_data.queue_message.id if guild_data.queue_message else None
+        guild_row = (guild_id, guild_data.assigned_channel_id, queue_message_id, position, time.time())
+        tracks = [guild_data.current_pod] if guild_data.current_pod else []
+        first_slot = 0 if guild_data.current_pod else 1
+        track_rows = [
+            (guild_id, slot, track.name, track.url, track.id, track.duration, int(track.is_live), track.start_at)
+            for slot, track in enumerate([*tracks, *guild_data.pod_queue], start=first_slot)
+        ]
+        return guild_row, track_rows
+
+    async def flush(self):
+        dirty, positions = self.dirty, self.positions - self.dirty
+        self.dirty, self.positions = set(), set()
+        guilds = [self.snapshot(guild_id, bot.guild_data[guild_id]) for guild_id in dirty if guild_id in bot.guild_data]
+        position_rows = []
+        for guild_id in positions:
+            guild_data = bot.guild_data.get(guild_id)
+            if guild_data and guild_data.current_pod and guild_data.audio:
+                position_rows.append((guild_data.audio.position, time.time(), guild_id))
+        if not guilds and not position_rows:
+            return
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.write, guilds, position_rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save state of {len(guilds) + len(position_rows)} guilds: {e}")
+            return
+        self.stats['flushes'] += 1
+        self.stats['guilds_written'] += len(guilds)
+        self.stats['positions_written'] += len(position_rows)
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(STATE_SCHEMA)
+        return self.connection
+
+    def write(self, guilds, position_rows):
+        connection = self.connect()
+        with connection:
+            for guild_row, track_rows in guilds:
+                connection.execute('INSERT OR REPLACE INTO guilds VALUES (?, ?, ?, ?, ?)', guild_row)
+                connection.execute('DELETE FROM tracks WHERE guild_id = ?', (guild_row[0],))
+                connection.executemany('INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)', track_rows)
+            connection.executemany('UPDATE guilds SET position = ?, updated_at = ? WHERE guild_id = ?', position_rows)
+
+    async def load(self, guild_id: int):
+        """Returns the saved state of a guild, or None if nothing was saved for it."""
+        if not self.path:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.read, guild_id)
+
+    def read(self, guild_id: int):
+        connection = self.connect()
+        row = connection.execute(
+            'SELECT assigned_channel_id, queue_message_id, position FROM guilds WHERE guild_id = ?', (guild_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        current, queue = None, []
+        for slot, *fields in connection.execute(
+            'SELECT slot, name, url, video_id, duration, is_live, start_at FROM tracks WHERE guild_id = ? ORDER BY slot', (guild_id,)
+        ):
+            track = Track(*fields)
+            track.is_live = bool(track.is_live)
+            if slot == 0:
+                current = track
+            else:
+                queue.append(track)
+        return {
+            'assigned_channel_id': row[0],
+            'queue_message_id': row[1],
+            'position': row[2],
+            'current': current,
+            'queue': queue
+        }
+
+    async def close(self):
+        """Writes pending changes and closes the database."""
+        await self.flush()
+        if self.connection is not None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.connection.close)
+            self.connection = None
+
+state_store = StateStore()
+
+LIBRARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS library (
+    key TEXT PRIMARY KEY,  -- Video id, or the URL of a playlist
+    kind TEXT NOT NULL,  -- 'video' or 'playlist'
+    title TEXT NOT NULL,
+    channel TEXT,
+    duration REAL,
+    url TEXT NOT NULL,
+    plays INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS library_search USING fts5(
+    title, channel, content='library', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS library_added AFTER INSERT ON library BEGIN
+    INSERT INTO library_search(rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS library_removed AFTER DELETE ON library BEGIN
+    INSERT INTO library_search(library_search, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS library_renamed AFTER UPDATE OF title, channel ON library BEGIN
+    INSERT INTO library_search(library_search, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+    INSERT INTO library_search(rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+END;
+CREATE TABLE IF NOT EXISTS spotify_matches (
+    spotify_id TEXT PRIMARY KEY,  -- Spotify episode or track id
+    video_id TEXT NOT NULL,
+    title TEXT,
+    channel TEXT,
+    duration REAL,
+    url TEXT NOT NULL,
+    matched_at REAL NOT NULL
+);
+"""
+
+class TrackIndex:
+    """Every video and playlist the bot has resolved, searchable by title and channel for /play.
+
+    Additions are batched and written at most once per `interval`, like StateStore writes. Searches
+    run on the same dedicated thread against SQLite full-text search, so an autocomplete lookup takes
+    milliseconds and never waits on the network. The YouTube video each Spotify item was matched to
+    is kept too, so importing the same show or playlist again needs no searches.
+    """
+    def __init__(self, path: str = TRACK_INDEX_PATH, interval: float = STATE_FLUSH_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.pending = {}  # Key -> row to upsert
+        self.plays = {}  # Key -> plays to add
+        self.matches = {}  # Spotify id -> row to upsert
+        self.task = None
+        self.connection = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='track-index')
+        self.stats = {'indexed': 0, 'autocompletes': 0, 'local_matches': 0, 'network_searches': 0}
+
+    def add_video(self, info: dict):
+        if self.path and info and info.get('id') and info.get('title') and not info.get('is_live'):
+            url = info.get('webpage_url') or f"https://www.youtube.com/watch?v={info['id']}"
+            self.pending[info['id']] = (info['id'], 'video', info['title'], info.get('channel'), info.get('duration'), url, time.time())
+            self.schedule()
+
+    def add_playlist(self, url: str, title: str):
+        if self.path and title:
+            self.pending[url] = (url, 'playlist', title, None, None, url, time.time())
+            self.played(url)
+
+    def played(self, key: str | None):
+        if self.path and key:
+            self.plays[key] = self.plays.get(key, 0) + 1
+            self.schedule()
+
+    def add_match(self, spotify_id: str, info: dict):
+        if self.path:
+            self.matches[spotify_id] = (
+                spotify_id, info['id'], info.get('title'), info.get('channel'), info.get('duration'), info['webpage_url'], time.time()
+            )
+            self.add_video(info)
+
+    def schedule(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while self.pending or self.plays or self.matches:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        rows, plays = list(self.pending.values()), [(count, time.time(), key) for key, count in self.plays.items()]
+        matches = list(self.matches.values())
+        self.pending, self.plays, self.matches = {}, {}, {}
+        if not rows and not plays and not matches:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.write, rows, plays, matches)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to index {len(rows)} tracks: {e}")
+            return
+        self.stats['indexed'] += len(rows)
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(LIBRARY_SCHEMA)
+        return self.connection
+
+    def write(self, rows, plays, matches=()):
+        connection = self.connect()
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO spotify_matches VALUES (?, ?, ?, ?, ?, ?, ?)', matches)
+            connection.executemany(
+                'INSERT INTO library (key, kind, title, channel, duration, url, last_used) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET title = excluded.title, channel = excluded.channel, '
+                'duration = excluded.duration, url = excluded.url, last_used = excluded.last_used', rows
+            )
+            connection.executemany('UPDATE library SET plays = plays + ?, last_used = ? WHERE key = ?', plays)
+
+    @staticmethod
+    def match_expression(text: str) -> str | None:
+        """Turns typed words into an FTS query where every word must appear, the last one possibly unfinished."""
+        words = re.findall(r'\w+', text.lower())
+        if not words:
+            return None
+        return ' '.join([*(f'"{word}"' for word in words[:-1]), f'"{words[-1]}"*'])
+
+    async def search(self, text: str, limit: int = AUTOCOMPLETE_CHOICES) -> list:
+        """Returns the best matches for `text`, or the most played entries when it is empty."""
+        if not self.path:
+            return []
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.query, self.match_expression(text), limit)
+
+    def query(self, expression: str | None, limit: int) -> list:
+        connection = self.connect()
+        columns = 'library.kind, library.title, library.channel, library.duration, library.url, library.plays'
+        if expression is None:
+            rows = connection.execute(f'SELECT {columns}, 0 FROM library ORDER BY plays DESC, last_used DESC LIMIT ?', (limit,))
+            return [self.entry(row) for row in rows]
+        rows = connection.execute(
+            f'SELECT {columns}, bm25(library_search) FROM library_search JOIN library ON library.rowid = library_search.rowid '
+            'WHERE library_search MATCH ? ORDER BY bm25(library_search) LIMIT ?', (expression, limit * 2)
+        ).fetchall()
+        # bm25 is lower for better matches; frequently played episodes move up
+        rows.sort(key=lambda row: row[6] - math.log1p(row[5]))
+        return [self.entry(row) for row in rows[:limit]]
+
+    async def lookup_matches(self, spotify_ids: list) -> dict:
+        """Returns the saved YouTube match of each of `spotify_ids` that has one, as video info."""
+        if not self.path or not spotify_ids:
+            return {}
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.query_matches, spotify_ids)
+
+    def query_matches(self, spotify_ids: list) -> dict:
+        connection = self.connect()
+        found = {}
+        for start in range(0, len(spotify_ids), 500):  # Within SQLite's limit on bound parameters
+            chunk = spotify_ids[start:start + 500]
+            rows = connection.execute(
+                f'SELECT spotify_id, video_id, title, channel, duration, url FROM spotify_matches '
+                f'WHERE spotify_id IN ({", ".join("?" * len(chunk))})', chunk
+            )
+            for spotify_id, video_id, title, channel, duration, url in rows:
+                found[spotify_id] = {'id': video_id, 'title': title, 'channel': channel, 'duration': duration, 'webpage_url': url}
+        return found
+
+    @staticmethod
+    def entry(row) -> dict:
+        kind, title, channel, duration, url, plays, _ = row
+        return {'kind': kind, 'title': title, 'channel': channel, 'duration': duration, 'url': url, 'plays': plays}
+
+    async def close(self):
+        await self.flush()
+        if self.connection is not None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.connection.close)
+            self.connection = None
+
+track_index = TrackIndex()
+
+class ShardLink:
+    """Connects a shard process to aquapod.launcher over a local socket.
+
+    Every `interval` the process sends a JSON line with its health and stats; the launcher answers
+    with the totals across all of its processes, which /stats shows.
+    """
+    def __init__(self, address: str, interval: float = SHARD_REPORT_INTERVAL):
+        self.host, _, port = address.rpartition(':')
+        self.port = int(port)
+        self.interval = interval
+        self.totals = None
+        self.task = None
+
+    @staticmethod
+    def report() -> dict:
+        latency = bot.latency
+        return {
+            'process': SHARD_PROCESS,
+            'shards': SHARD_IDS,
+            'ready': bot.is_ready(),
+            'latency_ms': None if latency != latency else round(latency * 1000),  # NaN until a shard connects
+            'guilds': len(bot.guilds),
+            'voice_sessions': len(bot.voice_clients),
+            'playing': sum(1 for voice_client in bot.voice_clients if voice_client.is_playing()),
+            'guild_states': len(bot.guild_data),
+            'queued_tracks': sum(len(guild_data.pod_queue) for guild_data in bot.guild_data.values())
+        }
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                logger.warning(f"Failed to reach the shard launcher at {self.host}:{self.port}: {e}")
+                await asyncio.sleep(self.interval)
+                continue
+            receiver = asyncio.create_task(self.receive(reader))
+            try:
+                while not receiver.done():
+                    writer.write(json.dumps(self.report()).encode() + b'\n')
+                    await writer.drain()
+                    await asyncio.sleep(self.interval)
+            except OSError as e:
+                logger.warning(f"Lost the connection to the shard launcher: {e}")
+            finally:
+                receiver.cancel()
+                writer.close()
+            await asyncio.sleep(self.interval)
+
+    async def receive(self, reader: asyncio.StreamReader):
+        while line := await reader.readline():
+            self.totals = json.loads(line)
+
+class PodTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Load saved state before any command runs, including in guilds whose state was evicted
+        # Autocomplete is left out; it has to answer within Discord's deadline and never needs the queue
+        if interaction.guild is not None and interaction.type is not discord.InteractionType.autocomplete:
+            await restore_guild_state(interaction.guild.id)
+        return True
+
 # Setup Discord bot 
-class PodBot(commands.Bot):
+class PodBot(commands.AutoShardedBot):
+    """Runs the shards in `SHARD_IDS`; guild state lives in the process that owns the guild's shard."""
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents)
+        super().__init__(command_prefix='!', intents=intents, tree_cls=PodTree, shard_ids=SHARD_IDS, shard_count=SHARD_COUNT)
         self.guild_data = {}  # Dictionary to hold data for each guild
+        self.shard_link = ShardLink(SHARD_COORDINATOR) if SHARD_COORDINATOR else None
+        self.metrics_runner = None
 
-    def get_guild_data(self, guild_id):
+    def get_guild_data(self, guild_id) -> GuildState:
         """Retrieve or initialize data for a specific guild."""
         if guild_id not in self.guild_data:
-            self.guild_data[guild_id] = {
-                'pod_queue': [],
-                'current_pod': None,
-                'queue_message': None,
-                'assigned_channel_id': None
-            }
-        return self.guild_data[guild_id]
+            self.guild_data[guild_id] = GuildState(guild_id=guild_id)
+        guild_data = self.guild_data[guild_id]
+        guild_data.last_active = time.monotonic()
+        return guild_data
 
     async def setup_hook(self):
         if SHOULD_SYNC:
             await self.tree.sync()  # Sync commands on setup; adjust if needed
+        if state_store.path:
+            self.checkpoint_task = asyncio.create_task(checkpoint_positions())
+        self.reclaim_task = asyncio.create_task(reclaim_idle())
+        if self.shard_link:
+            self.shard_link.task = asyncio.create_task(self.shard_link.run())
+        self.lag_task = asyncio.create_task(monitor_loop_lag())
+        if METRICS_PORT:
+            try:
+                self.metrics_runner = await start_metrics_server()
+            except OSError as e:
+                logger.warning(f"Failed to serve metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+    async def close(self):
+        await state_store.close()
+        await track_index.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await super().close()
 
 bot = PodBot()
 
@@ -71,6 +1207,11 @@ class ControlButtons(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
 
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # The guild's state may have been evicted since these buttons were posted
+        await restore_guild_state(interaction.guild.id)
+        return True
+
     @discord.ui.button(label='Pause', style=discord.ButtonStyle.primary, emoji='⏸️')
     async def pause_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not await is_dj_or_admin(interaction):
@@ -105,25 +1246,142 @@ async def on_ready():
     await find_controller_channel()
 
 async def find_controller_channel():
+    """Sets up the controller channel of every guild, a bounded number of guilds at a time."""
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(STARTUP_CONCURRENCY)
     for guild in bot.guilds:
-        guild_data = bot.get_guild_data(guild.id)
-        channel = discord.utils.get(guild.text_channels, name="aquapod-controller")
+        bot.get_guild_data(guild.id).ready.clear()
+
+    async def setup(guild):
+        async with semaphore:
+            try:
+                await setup_controller_channel(guild)
+            except Exception as e:
+                print(f"{bcolors.FAIL}Failed to set up controller channel in guild {guild.name}: {e}{bcolors.DEFAULT}")
+            finally:
+                bot.get_guild_data(guild.id).ready.set()
+
+    await asyncio.gather(*(setup(guild) for guild in bot.guilds))
+    print(f"{bcolors.OKBLUE}Set up {len(bot.guilds)} guilds in {time.perf_counter() - started:.1f}s{bcolors.DEFAULT}")
+
+def resume_offset(pod: Track, position: float) -> float:
+    """Where a track stopped at `position` starts again: shortly before it for long episodes, otherwise from the top."""
+    if not pod.is_live and (pod.duration or 0) >= RESUME_MIN_DURATION:
+        return max(position - RESUME_REWIND_SECONDS, 0.0)
+    return 0.0
+
+async def restore_guild_state(guild_id: int):
+    """Loads a guild's saved channel and queue the first time the guild is touched after startup or eviction.
+
+    The interrupted track goes back to the front of the queue, and long episodes resume shortly before
+    the saved position. State built up since startup is left alone. Returns the saved state, if any.
+    """
+    guild_data = bot.get_guild_data(guild_id)
+    if guild_data.restored:
+        return None
+    guild_data.restored = True
 
-        if channel:
-            guild_data['assigned_channel_id'] = channel.id
-            print(f"{bcolors.OKBLUE}Found #aquapod-controller channel in guild {guild.name}. ID: {channel.id}{bcolors.DEFAULT}")
+    try:
+        saved = await state_store.load(guild_id)
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to load saved state of guild {guild_id}: {e}")
+        return None
+    if not saved:
+        return None
+
+    if guild_data.assigned_channel_id is None:
+        guild_data.assigned_channel_id = saved['assigned_channel_id']
+    if guild_data.queue_message is None and saved['queue_message_id']:
+        channel = bot.get_channel(guild_data.assigned_channel_id) if guild_data.assigned_channel_id else None
+        if isinstance(channel, discord.TextChannel):
+            guild_data.queue_message = channel.get_partial_message(saved['queue_message_id'])
+    if guild_data.current_pod is None and not guild_data.pod_queue:
+        tracks = saved['queue']
+        current = saved['current']
+        if current:
+            current.start_at = resume_offset(current, saved['position'])
+            tracks = [current, *tracks]
+        guild_data.pod_queue.extend(tracks)
+        logger.info(f"Restored {len(tracks)} tracks in guild {guild_id}")
+    return saved
+
+async def checkpoint_positions():
+    """Periodically saves how far into their current track guilds are, so long episodes can resume there."""
+    while True:
+        await asyncio.sleep(POSITION_CHECKPOINT_INTERVAL)
+        for guild_id, guild_data in bot.guild_data.items():
+            pod = guild_data.current_pod
+            if pod and guild_data.audio and not pod.is_live and (pod.duration or 0) >= RESUME_MIN_DURATION:
+                state_store.mark_position(guild_id)
+
+async def setup_controller_channel(guild: discord.Guild):
+    """Clears #aquapod-controller, keeping the bot's last queue message to reuse instead of posting a new one.
+
+    A channel picked with /set_channel before a restart is kept but never purged; its saved queue
+    message is edited instead.
+    """
+    guild_data = bot.get_guild_data(guild.id)
+    saved = await restore_guild_state(guild.id)
+
+    assigned = guild.get_channel(guild_data.assigned_channel_id) if guild_data.assigned_channel_id else None
+    if assigned is not None and assigned.name != "aquapod-controller":
+        await reuse_saved_queue_message(assigned, guild_data, saved['queue_message_id'] if saved else None)
+        return
 
-            # Delete all messages in the channel
-            async for message in channel.history(limit=None):
-                try:
-                    await message.delete()
-                except Exception as e:
-                    print(f"{bcolors.WARNING}Failed to delete message in guild {guild.name}: {e}{bcolors.DEFAULT}")
+    channel = discord.utils.get(guild.text_channels, name="aquapod-controller")
 
-            # Create a new persistent queue message for this channel
-            guild_data['queue_message'] = await channel.send(content=update_queue_message_content(guild.id), view=ControlButtons())
-        else:
-            print(f"{bcolors.WARNING}Could not find #aquapod-controller channel in guild {guild.name}.{bcolors.DEFAULT}")
+    if not channel:
+        print(f"{bcolors.WARNING}Could not find #aquapod-controller channel in guild {guild.name}.{bcolors.DEFAULT}")
+        return
+
+    started = time.perf_counter()
+    guild_data.assigned_channel_id = channel.id
+    print(f"{bcolors.OKBLUE}Found #aquapod-controller channel in guild {guild.name}. ID: {channel.id}{bcolors.DEFAULT}")
+
+    queue_message = None
+
+    def should_delete(message: discord.Message) -> bool:
+        nonlocal queue_message
+        # History is newest first, so this adopts the most recent queue message
+        if queue_message is None and message.author == bot.user and message.components:
+            queue_message = message
+            return False
+        return True
+
+    # Delete everything else, in bulk where Discord allows it (messages under 14 days old)
+    try:
+        deleted = await channel.purge(limit=None, check=should_delete, bulk=True)
+    except discord.HTTPException as e:
+        deleted = []
+        print(f"{bcolors.WARNING}Failed to delete messages in guild {guild.name}: {e}{bcolors.DEFAULT}")
+
+    content = update_queue_message_content(guild.id)
+    reused = queue_message is not None
+    if reused:
+        # A fresh view replaces the buttons left by the previous run, which are no longer handled
+        await queue_message.edit(content=content, view=get_control_view(guild_data))
+    else:
+        queue_message = await channel.send(content=content, view=get_control_view(guild_data))
+    guild_data.queue_message = queue_message
+    state_store.mark_dirty(guild.id)
+
+    print(f"{bcolors.OKBLUE}Controller ready in guild {guild.name}: deleted {len(deleted)} messages, "
+          f"{'reused' if reused else 'created'} queue message in {time.perf_counter() - started:.1f}s{bcolors.DEFAULT}")
+
+async def reuse_saved_queue_message(channel: discord.TextChannel, guild_data, queue_message_id):
+    """Points the queue message saved for `channel` at this run's buttons, posting a new one if it is gone."""
+    content = update_queue_message_content(channel.guild.id)
+    queue_message = None
+    if queue_message_id:
+        try:
+            queue_message = await channel.get_partial_message(queue_message_id).edit(content=content, view=get_control_view(guild_data))
+        except discord.NotFound:
+            pass
+    if queue_message is None:
+        queue_message = await channel.send(content=content, view=get_control_view(guild_data))
+    guild_data.queue_message = queue_message
+    state_store.mark_dirty(channel.guild.id)
+    print(f"{bcolors.OKBLUE}Controller ready in guild {channel.guild.name}: using saved channel #{channel.name}{bcolors.DEFAULT}")
 
 async def is_dj_or_admin(interaction: discord.Interaction) -> bool:
     user = interaction.user if hasattr(interaction, 'user') else getattr(interaction, 'member', None)
@@ -134,86 +1392,411 @@ async def is_dj_or_admin(interaction: discord.Interaction) -> bool:
 def update_queue_message_content(guild_id) -> str:
     """Generates the content for the persistent queue message for a specific guild."""
     guild_data = bot.get_guild_data(guild_id)
-    now_playing = f"**Now Playing:** {guild_data['current_pod']['name'] if guild_data['current_pod'] else 'Nothing'}"
+    now_playing = f"**Now Playing:** {guild_data.current_pod.name if guild_data.current_pod else 'Nothing'}"
 
     queue_content = "\n\n**Queue (next 5):**\n"
-    if not guild_data['pod_queue']:
+    if not guild_data.pod_queue:
         queue_content += "The queue is currently empty."
     else:
         # Show only the next 5 songs
-        for idx, pod in enumerate(guild_data['pod_queue'][:5], start=1):
-            queue_content += f"{idx}. {pod['name']}\n"
-        if len(guild_data['pod_queue']) > 5:
-            queue_content += f"...and {len(guild_data['pod_queue']) - 5} more."
+        for idx, pod in enumerate(guild_data.pod_queue.peek(5), start=1):
+            queue_content += f"{idx}. {pod.name}\n"
+        if len(guild_data.pod_queue) > 5:
+            queue_content += f"...and {len(guild_data.pod_queue) - 5} more."
 
     return now_playing + queue_content
 
+def get_control_view(guild_data) -> 'ControlButtons':
+    """Returns the guild's control buttons; one view is reused for every queue message."""
+    if guild_data.control_view is None:
+        guild_data.control_view = ControlButtons()
+    return guild_data.control_view
+
+class QueueRenderer:
+    """Keeps one guild's persistent queue message up to date.
+
+    Updates only mark the message dirty; bursts are coalesced into at most one edit per
+    `interval`, and edits are skipped when the rendered content has not changed. The next
+    edit is timed from when the previous one finished, so rate-limited edits back off.
+    """
+    def __init__(self, guild_id: int, interval: float = QUEUE_RENDER_INTERVAL):
+        self.guild_id = guild_id
+        self.interval = interval
+        self.dirty = False
+        self.task = None
+        self.last_content = None
+        self.last_render = float('-inf')
+
+    def mark_dirty(self):
+        render_stats['requested'] += 1
+        self.dirty = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # Wait for startup to finish with this guild's controller channel
+        await bot.get_guild_data(self.guild_id).ready.wait()
+        while self.dirty:
+            delay = self.last_render + self.interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.dirty = False
+            try:
+                await self.render()
+            except discord.HTTPException as e:
+                print(f"{bcolors.WARNING}Failed to update queue message in guild {self.guild_id}: {e}{bcolors.DEFAULT}")
+            self.last_render = loop.time()
+
+    async def render(self):
+        guild_data = bot.get_guild_data(self.guild_id)
+        channel = bot.get_channel(guild_data.assigned_channel_id) if guild_data.assigned_channel_id else None
+        if channel is None:
+            return
+
+        content = update_queue_message_content(self.guild_id)
+        if guild_data.queue_message and content == self.last_content:
+            render_stats['unchanged'] += 1
+            return
+
+        render_stats['sent'] += 1
+        if guild_data.queue_message:
+            try:
+                # The view is left out so the existing buttons are kept as they are
+                await guild_data.queue_message.edit(content=content)
+            except discord.NotFound:
+                guild_data.queue_message = await channel.send(content=content, view=get_control_view(guild_data))
+                state_store.mark_dirty(self.guild_id)
+        else:
+            guild_data.queue_message = await channel.send(content=content, view=get_control_view(guild_data))
+            state_store.mark_dirty(self.guild_id)
+        self.last_content = content
+
+def refresh_queue_message(guild_id: int) -> bool:
+    """Schedules an update of the guild's queue message. Returns False if the guild has no channel set."""
+    guild_data = bot.get_guild_data(guild_id)
+    if not guild_data.assigned_channel_id:
+        return False
+    if guild_data.renderer is None:
+        guild_data.renderer = QueueRenderer(guild_id)
+    guild_data.renderer.mark_dirty()
+    return True
+
 async def update_queue_message(interaction: discord.Interaction):
-    """Updates the persistent queue message or sends a new one if it does not exist."""
-    guild_data = bot.get_guild_data(interaction.guild.id)
-    
-    if guild_data['assigned_channel_id']:
-        channel = bot.get_channel(guild_data['assigned_channel_id'])
-        if guild_data['queue_message']:
-            await guild_data['queue_message'].edit(content=update_queue_message_content(interaction.guild.id), view=ControlButtons())
+    """Schedules an update of the persistent queue message, or sends a new one if it does not exist."""
+    if refresh_queue_message(interaction.guild.id):
+        return
+    if not interaction.response.is_done():
+        await interaction.response.send_message("No channel is set for the bot. Use the /set_channel command to set one.", ephemeral=True)
+    else:
+        await interaction.followup.send("No channel is set for the bot. Use the /set_channel command to set one.", ephemeral=True)
+
+class TrackedAudio(discord.AudioSource):
+    """Wraps an audio source to report its first packet and when playback nears the end.
+
+    `read` runs on the voice player thread, so callbacks are handed back to `loop`.
+    """
+    def __init__(self, source: discord.AudioSource, loop: asyncio.AbstractEventLoop, on_start=None, near_end_at=None, on_near_end=None, offset: float = 0.0):
+        self.source = source
+        self.loop = loop
+        self.frames = 0
+        self.offset = offset
+        self.interrupted = False  # Set when a user skips or stops, so the end is not mistaken for a dropped stream
+        self.on_start = on_start
+        self.near_end_at = near_end_at
+        self.on_near_end = on_near_end
+
+    @property
+    def position(self) -> float:
+        """Seconds into the track, counting from `offset` where playback started."""
+        return self.offset + self.frames * discord.opus.Encoder.FRAME_LENGTH / 1000
+
+    def read(self) -> bytes:
+        data = self.source.read()
+        if self.frames == 0 and self.on_start:
+            self.loop.call_soon_threadsafe(self.on_start, time.perf_counter())
+        self.frames += 1
+        if self.near_end_at is not None and self.position >= self.near_end_at:
+            self.near_end_at = None
+            if self.on_near_end:
+                self.loop.call_soon_threadsafe(self.on_near_end)
+        return data
+
+    def is_opus(self) -> bool:
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
+
+def ffmpeg_input_options(stream: dict, start_at: float = 0.0):
+    url = stream['url']
+    options = []
+    if url.startswith(('http://', 'https://')):
+        if stream.get('is_live'):
+            options.append(FFMPEG_LIVE_OPTIONS)
         else:
-            guild_data['queue_message'] = await channel.send(content=update_queue_message_content(interaction.guild.id), view=ControlButtons())
+            options.append(FFMPEG_STREAM_OPTIONS)
+        if '.m3u8' in url or '/hls_playlist/' in url:
+            options.append(FFMPEG_HLS_OPTIONS)
+    if start_at:
+        # Seeking on the input lets FFmpeg jump to the offset instead of decoding everything before it
+        options.append(f'-ss {start_at:.0f}')
+    return ' '.join(options) or None
+
+def create_audio_source(stream: dict, start_at: float = 0.0, mode: str = None) -> discord.AudioSource:
+    """Opens FFmpeg on a resolved stream (`url` and `acodec`, as returned by `extract_stream_async`).
+
+    In 'opus' mode FFmpeg outputs Opus, which discord.py sends without encoding it again; Opus
+    upstream audio is copied through and anything else is transcoded once. 'pcm' mode decodes to PCM.
+    """
+    mode = mode or PLAYBACK_MODE
+    before_options = ffmpeg_input_options(stream, start_at)
+    started = time.perf_counter()
+    if mode == 'opus':
+        codec = 'copy' if stream.get('acodec') == 'opus' else 'libopus'
+        kind = 'copy' if codec == 'copy' else 'transcode'
+        source = discord.FFmpegOpusAudio(stream['url'], codec=codec, bitrate=AUDIO_BITRATE, before_options=before_options)
     else:
-        await interaction.response.send_message("No channel is set for the bot. Use the /set_channel command to set one.", ephemeral=True)
-
-async def play_podcast(interaction: discord.Interaction):
-    guild_data = bot.get_guild_data(interaction.guild.id)
+        kind = 'pcm'
+        source = discord.FFmpegPCMAudio(stream['url'], before_options=before_options)
+    source_stats[kind] += 1
+    ffmpeg_spawn_seconds.observe(time.perf_counter() - started, kind)
+    return source
+
+def record_next_audio_latency(ended_at: float, started_at: float, prefetched: bool):
+    gap = started_at - ended_at
+    track_gap_seconds.observe(gap, 'prefetched' if prefetched else 'cold')
+    playback_stats['transitions'] += 1
+    playback_stats['prefetched'] += int(prefetched)
+    playback_stats['recent_gaps'].append(gap)
+    recent = playback_stats['recent_gaps']
+    logger.info(
+        f"Time to next audio: {gap * 1000:.0f}ms ({'prefetched' if prefetched else 'cold'}), "
+        f"average {sum(recent) / len(recent) * 1000:.0f}ms over last {len(recent)}, "
+        f"{playback_stats['prefetched']}/{playback_stats['transitions']} prefetched"
+    )
+
+def record_first_audio_latency(requested_at: float, started_at: float):
+    latency = started_at - requested_at
+    first_audio_seconds.observe(latency)
+    first_audio_stats['requests'] += 1
+    first_audio_stats['recent'].append(latency)
+    recent = first_audio_stats['recent']
+    p50, p95 = percentile(recent, 0.5), percentile(recent, 0.95)
+    logger.info(f"Time to first audio: {latency * 1000:.0f}ms, p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms over last {len(recent)}")
+    if latency > FIRST_AUDIO_TARGET_P95:
+        first_audio_stats['over_target'] += 1
+        logger.warning(f"Time to first audio {latency:.1f}s is over the p95 target of {FIRST_AUDIO_TARGET_P95:.1f}s")
+
+def discard_prefetch(guild_data):
+    """Drops the prefetched next track, stopping its FFmpeg process if one was started."""
+    prefetch = guild_data.prefetch
+    guild_data.prefetch = None
+    if not prefetch:
+        return
+    prefetch['stream_task'].cancel()
+    source_task = prefetch['source_task']
+    if source_task and not source_task.cancel():
+        # Already finished; close the FFmpeg process it opened
+        if not source_task.cancelled() and source_task.exception() is None and source_task.result():
+            source_task.result().cleanup()
+
+def start_prefetch(guild_data):
+    """Resolves the stream URL of the next queued track in the background."""
+    next_pod = guild_data.pod_queue[0] if guild_data.pod_queue else None
+    prefetch = guild_data.prefetch
+    if prefetch and prefetch['pod'] is next_pod:
+        if time.monotonic() - prefetch['resolved_at'] < PREFETCH_URL_MAX_AGE:
+            return prefetch
+    discard_prefetch(guild_data)
+    if next_pod is None:
+        return None
+
+    stream_task = asyncio.create_task(resolve_stream(next_pod, guild_data.guild_id))
+    stream_task.add_done_callback(lambda task: task.cancelled() or task.exception())  # Failures surface when the track is taken
+    guild_data.prefetch = {
+        'pod': next_pod,
+        'stream_task': stream_task,
+        'resolved_at': time.monotonic(),
+        'source_task': None
+    }
+    return guild_data.prefetch
 
-    if not guild_data['current_pod']:
-        await interaction.followup.send("Nothing is currently set to play.", ephemeral=True)
+def prefetch_source(guild_data):
+    """Called as the current track nears its end: starts FFmpeg for the next track."""
+    prefetch = start_prefetch(guild_data)
+    if not prefetch or prefetch['source_task']:
         return
 
+    async def open_source():
+        stream = await prefetch['stream_task']
+        if not stream:
+            return None
+        return create_audio_source(stream, prefetch['pod'].start_at)
+
+    prefetch['source_task'] = asyncio.create_task(open_source())
+    logger.info(f"Prefetching next track: {prefetch['pod'].name}")
+
+async def resolve_stream(pod: Track, guild_id: int = None):
+    """Returns what to play `pod` from: its file in the audio cache if there is one, otherwise its YouTube stream."""
+    cached = audio_cache.lookup(pod.id)
+    if cached:
+        return {'url': cached, 'acodec': 'opus'}
+    stream = await extract_stream_async(pod.url, guild_id)
+    if stream:
+        audio_cache.fill(pod, stream)
+    return stream
+
+async def take_prefetched_source(guild_data, pod):
+    """Returns the prefetched source for `pod` if there is one, waiting for it if still in flight."""
+    prefetch = guild_data.prefetch
+    if not prefetch or prefetch['pod'] is not pod or time.monotonic() - prefetch['resolved_at'] >= PREFETCH_URL_MAX_AGE:
+        discard_prefetch(guild_data)
+        return None
+    guild_data.prefetch = None
+
     try:
-        print(f"{bcolors.OKCYAN}Attempting to play: {guild_data['current_pod']['name']}{bcolors.DEFAULT}")
-        is_live = guild_data['current_pod'].get('is_live', False)
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'quiet': True,
-            'noplaylist': True,
-            'cachedir': False
-        }
+        if prefetch['source_task']:
+            return await prefetch['source_task']
+        stream = await prefetch['stream_task']
+        return create_audio_source(stream, pod.start_at) if stream else None
+    except Exception as e:
+        logger.warning(f"Prefetch for {pod.name} failed: {e}")
+        return None
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(guild_data['current_pod']['url'], download=False)
-            url = info.get('url')
+async def play_podcast(interaction: discord.Interaction, ended_at: float = None, requested_at: float = None, recovering_since: float = None):
+    """Plays the guild's current track. `ended_at` is when the previous track ended, `requested_at`
+    when /play was invoked and `recovering_since` when the track's stream dropped; each is used to
+    measure how long it took to produce audio."""
+    guild_data = bot.get_guild_data(interaction.guild.id)
 
-        if not url:
-            await interaction.followup.send("Failed to play the current track.", ephemeral=True)
-            await play_next(interaction)
-            return
+    if not guild_data.current_pod:
+        await interaction.followup.send("Nothing is currently set to play.", ephemeral=True)
+        return
 
+    try:
+        pod = guild_data.current_pod
+        print(f"{bcolors.OKCYAN}Attempting to play: {pod.name}{bcolors.DEFAULT}")
+
+        # The prefetch belongs to the next track while this one is being reconnected
+        source = None if recovering_since is not None else await take_prefetched_source(guild_data, pod)
+        prefetched = source is not None
+        if source is None:
+            stream = await resolve_stream(pod, interaction.guild.id)
+            if not stream:
+                await interaction.followup.send("Failed to play the current track.", ephemeral=True)
+                await play_next(interaction)
+                return
+            source = create_audio_source(stream, pod.start_at)
+
+        loop = asyncio.get_running_loop()
+
+        def on_start(started_at):
+            if ended_at is not None:
+                record_next_audio_latency(ended_at, started_at, prefetched)
+            if requested_at is not None:
+                record_first_audio_latency(requested_at, started_at)
+            if recovering_since is not None:
+                recovery_stats['recovered'] += 1
+                recovery_stats['recent_latency'].append(started_at - recovering_since)
+                logger.info(f"Resumed {pod.name} at {pod.start_at:.0f}s after {(started_at - recovering_since) * 1000:.0f}ms")
+
+        near_end_at = None
+        if pod.duration and not pod.is_live:
+            near_end_at = max(pod.duration - PREFETCH_LEAD_SECONDS, 0)
+
+        def after(error):
+            if error:
+                logger.error(f"Player error in guild {interaction.guild.id}: {error}")
+            asyncio.run_coroutine_threadsafe(track_ended(interaction, pod, audio, error, time.perf_counter()), loop)
+
+        audio = TrackedAudio(
+            source, loop, on_start=on_start, near_end_at=near_end_at,
+            on_near_end=lambda: prefetch_source(guild_data), offset=pod.start_at
+        )
         voice_client = interaction.guild.voice_client
-        voice_client.play(discord.FFmpegPCMAudio(url), after=lambda e: bot.loop.create_task(play_next(interaction)))
-        
+        voice_client.play(audio, after=after)
+        guild_data.audio = audio
+        start_prefetch(guild_data)
+        if recovering_since is None:
+            track_index.played(ExtractionCache.key_for(pod.url))
+
     except Exception as e:
         print(f"{bcolors.FAIL}Error in play_podcast: {e}{bcolors.DEFAULT}")
         await interaction.followup.send(f"An error occurred while trying to play the track.", ephemeral=True)
         
-        if len(guild_data['pod_queue']) > 0:
+        if len(guild_data.pod_queue) > 0:
             await play_next(interaction)
         else:
-            guild_data['current_pod'] = None
+            guild_data.current_pod = None
 
     await update_queue_message(interaction)
 
-async def play_next(interaction: discord.Interaction):
+def ended_early(pod: Track, audio: TrackedAudio, error) -> bool:
+    """Whether a track stopped because its stream failed rather than because it finished or was skipped."""
+    if audio.interrupted:
+        return False
+    if error is not None or pod.is_live:
+        return True
+    return bool(pod.duration) and audio.position < pod.duration - STREAM_END_TOLERANCE
+
+async def track_ended(interaction: discord.Interaction, pod: Track, audio: TrackedAudio, error, ended_at: float):
+    """Runs when the player finishes a track: reconnects a dropped stream, otherwise moves on to the next track."""
     guild_data = bot.get_guild_data(interaction.guild.id)
+    if guild_data.current_pod is pod and ended_early(pod, audio, error):
+        if guild_data.stream_retries < STREAM_RETRY_LIMIT:
+            if await recover_stream(interaction, pod, audio, ended_at):
+                return
+        else:
+            recovery_stats['gave_up'] += 1
+            logger.warning(f"Giving up on {pod.name} after {guild_data.stream_retries} reconnects")
+    if guild_data.current_pod is pod:
+        await play_next(interaction, ended_at=ended_at)
 
-    if len(guild_data['pod_queue']) > 0:
-        guild_data['current_pod'] = guild_data['pod_queue'].pop(0)
-        await play_podcast(interaction)
+async def recover_stream(interaction: discord.Interaction, pod: Track, audio: TrackedAudio, failed_at: float) -> bool:
+    """Resolves a fresh stream URL for a dropped track and resumes it where it stopped.
+
+    Returns False if the track should be considered finished, such as a live stream that has ended.
+    """
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    guild_data.stream_retries += 1
+    recovery_stats['attempts'] += 1
+    logger.warning(
+        f"Stream for {pod.name} dropped at {audio.position:.0f}s in guild {interaction.guild.id}, "
+        f"reconnecting ({guild_data.stream_retries}/{STREAM_RETRY_LIMIT})"
+    )
+    # Back off after the first attempt in case the failure is on YouTube's side
+    await asyncio.sleep(guild_data.stream_retries - 1)
+    if guild_data.current_pod is not pod:
+        return True  # Skipped or stopped meanwhile
+
+    extraction_cache.invalidate_stream(pod.url)
+    try:
+        stream = await extract_stream_async(pod.url, interaction.guild.id)
+    except Exception as e:
+        logger.warning(f"Failed to resolve {pod.name} again: {e}")
+        stream = None
+    if not stream or (pod.is_live and not stream.get('is_live')):
+        return False
+    if not pod.is_live:
+        pod.start_at = audio.position
+    await play_podcast(interaction, recovering_since=failed_at)
+    return True
+
+async def play_next(interaction: discord.Interaction, ended_at: float = None):
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    guild_data.audio = None
+    guild_data.stream_retries = 0
+
+    if len(guild_data.pod_queue) > 0:
+        guild_data.current_pod = guild_data.pod_queue.popleft()
+        guild_data.queue_space.set()
+        state_store.mark_dirty(interaction.guild.id)
+        await play_podcast(interaction, ended_at=ended_at)
     else:
-        guild_data['current_pod'] = None
+        guild_data.current_pod = None
+        state_store.mark_dirty(interaction.guild.id)
+        discard_prefetch(guild_data)
         await interaction.followup.send("No more tracks in queue.", ephemeral=True)
     
     await update_queue_message(interaction)
@@ -229,67 +1812,589 @@ async def resume_action(interaction: discord.Interaction):
     if interaction.guild.voice_client and interaction.guild.voice_client.is_paused():
         interaction.guild.voice_client.resume()
         await interaction.response.send_message("Resumed the playback.", ephemeral=True)
-    else:
+    elif not await resume_restored_queue(interaction):
         await interaction.response.send_message("No audio is paused.", ephemeral=True)
 
+async def resume_restored_queue(interaction: discord.Interaction) -> bool:
+    """Starts playing a queue restored after a restart, joining the user's voice channel."""
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    voice = getattr(interaction.user, 'voice', None)
+    if guild_data.current_pod or not guild_data.pod_queue or voice is None:
+        return False
+
+    if not interaction.guild.voice_client:
+        await voice.channel.connect()
+    await interaction.response.send_message("Resuming the queue.", ephemeral=True)
+    await play_next(interaction)
+    return True
+
+def interrupt_playback(guild_data):
+    """Marks the playing track as stopped on purpose, so its end does not trigger a reconnect."""
+    if guild_data.audio:
+        guild_data.audio.interrupted = True
+
 async def skip_action(interaction: discord.Interaction):
     if interaction.guild.voice_client and (interaction.guild.voice_client.is_playing() or interaction.guild.voice_client.is_paused()):
+        interrupt_playback(bot.get_guild_data(interaction.guild.id))
         interaction.guild.voice_client.stop()
         await interaction.response.send_message("Skipped the current track.", ephemeral=True)
     else:
         await interaction.response.send_message("No audio is currently playing.", ephemeral=True)
 
+def cancel_pending_extractions(guild_data, priorities=(ExtractionScheduler.NOW, ExtractionScheduler.INTERACTIVE, ExtractionScheduler.BACKFILL)):
+    """Stops the guild's playlist loads and drops its extraction jobs at `priorities` that have not started yet."""
+    for task in guild_data.playlist_tasks:
+        task.cancel()
+    extraction_scheduler.cancel(guild_data.guild_id, priorities)
+
 async def stop_action(interaction: discord.Interaction):
     guild_data = bot.get_guild_data(interaction.guild.id)
 
     if interaction.guild.voice_client:
+        interrupt_playback(guild_data)
         interaction.guild.voice_client.stop()
         await interaction.guild.voice_client.disconnect()
-        guild_data['current_pod'] = None
-        guild_data['pod_queue'].clear()
+        guild_data.current_pod = None
+        guild_data.audio = None
+        guild_data.pod_queue.clear()
+        discard_prefetch(guild_data)
+        cancel_pending_extractions(guild_data)
+        state_store.mark_dirty(interaction.guild.id)
         await interaction.response.send_message("Stopped the playback and cleared the queue.", ephemeral=True)
     else:
         await interaction.response.send_message("No audio is currently playing.", ephemeral=True)
 
-async def extract_playlist_videos_async(query: str):
-    """Extracts the video URLs from a playlist and processes them one at a time."""
-    ydl_opts = {
+def voice_idle_reason(voice_client) -> tuple[str, float] | None:
+    """Why `voice_client` could be disconnected and after how long: sooner with nobody listening. None while in use."""
+    listening = any(not member.bot for member in voice_client.channel.members)
+    if not listening and VOICE_ALONE_TIMEOUT:
+        return 'alone', VOICE_ALONE_TIMEOUT
+    if not voice_client.is_playing() and VOICE_IDLE_TIMEOUT:
+        return 'idle', VOICE_IDLE_TIMEOUT
+    return None
+
+async def leave_voice(guild: discord.Guild):
+    """Disconnects from voice, putting the current track back at the front of the queue for /resume."""
+    guild_data = bot.get_guild_data(guild.id)
+    pod = guild_data.current_pod
+    if pod:
+        # Cleared first so the player's end callback does not move on to the next track
+        guild_data.current_pod = None
+        if guild_data.audio:
+            pod.start_at = resume_offset(pod, guild_data.audio.position)
+        guild_data.pod_queue.appendleft(pod)
+    interrupt_playback(guild_data)
+    guild_data.audio = None
+    guild_data.voice_idle_since = None
+    discard_prefetch(guild_data)
+    await guild.voice_client.disconnect()
+    state_store.mark_dirty(guild.id)
+    refresh_queue_message(guild.id)
+
+def is_evictable(guild_data, now: float) -> bool:
+    """Whether a guild's state can be dropped from memory and loaded again from the state store when next used."""
+    if not GUILD_STATE_TTL or now - guild_data.last_active < GUILD_STATE_TTL:
+        return False
+    if guild_data.current_pod or guild_data.playlist_tasks or not guild_data.ready.is_set():
+        return False
+    renderer = guild_data.renderer
+    if renderer and (renderer.dirty or (renderer.task and not renderer.task.done())):
+        return False
+    if not state_store.path:
+        # Nothing would bring it back
+        return not guild_data.pod_queue and guild_data.assigned_channel_id is None
+    return guild_data.guild_id not in state_store.dirty and guild_data.guild_id not in state_store.positions
+
+def evict_cold_guilds(now: float) -> int:
+    """Drops the state of guilds untouched for `GUILD_STATE_TTL`. Returns how many were evicted."""
+    evicted = 0
+    for guild_id, guild_data in list(bot.guild_data.items()):
+        guild = bot.get_guild(guild_id)
+        if guild and guild.voice_client:
+            continue
+        if is_evictable(guild_data, now):
+            del bot.guild_data[guild_id]
+            extraction_scheduler.guild_stats.pop(guild_id, None)
+            evicted += 1
+    reclaim_stats['evictions'] += evicted
+    return evicted
+
+async def reclaim_idle():
+    """Periodically leaves voice channels nobody is using and evicts guild state nobody has touched."""
+    while True:
+        await asyncio.sleep(RECLAIM_INTERVAL)
+        now = time.monotonic()
+        for voice_client in list(bot.voice_clients):
+            guild_data = bot.get_guild_data(voice_client.guild.id)
+            idle = voice_idle_reason(voice_client)
+            if idle is None:
+                guild_data.voice_idle_since = None
+                continue
+            if guild_data.voice_idle_since is None:
+                guild_data.voice_idle_since = now
+            reason, timeout = idle
+            if now - guild_data.voice_idle_since < timeout:
+                continue
+            reclaim_stats[f'{reason}_disconnects'] += 1
+            logger.info(f"Leaving voice in guild {voice_client.guild.id}, {reason} for {now - guild_data.voice_idle_since:.0f}s")
+            try:
+                await leave_voice(voice_client.guild)
+            except Exception as e:
+                logger.warning(f"Failed to leave voice in guild {voice_client.guild.id}: {e}")
+        evicted = evict_cold_guilds(now)
+        if evicted:
+            logger.info(f"Evicted the state of {evicted} idle guilds, {len(bot.guild_data)} still in memory")
+
+# yt-dlp options for each kind of extraction
+EXTRACTION_OPTIONS = {
+    'playlist': {
         'quiet': True,
         'extract_flat': True,  # Extract metadata without downloading or fetching full details
+        'format': AUDIO_FORMATS[PLAYBACK_MODE],  # So a single video found here is ready to play
         'cachedir': False,
         'ignoreerrors': True,  # Skip problematic videos in the playlist
         'retries': 5,
         'socket_timeout': 15
-    }
-
-    loop = asyncio.get_event_loop()
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        # Extract flat playlist metadata (only URLs)
-        logger.info(f"Started extracting playlist: {query}")
-        playlist_info = await loop.run_in_executor(executor, ydl.extract_info, query, False)
-
-    return playlist_info
-
-async def extract_video_info_async(video_url: str):
-    """Extracts details for an individual video."""
-    ydl_opts = {
+    },
+    'video': {
         'quiet': True,
-        'format': 'bestaudio/best',
+        'format': AUDIO_FORMATS[PLAYBACK_MODE],
         'cachedir': False,
         'ignoreerrors': True,
         'retries': 5,
         'socket_timeout': 15
+    },
+    'stream': {
+        'format': AUDIO_FORMATS[PLAYBACK_MODE],
+        'quiet': True,
+        'noplaylist': True,
+        'cachedir': False
+    },
+    'search': {
+        'quiet': True,
+        'extract_flat': True,  # Only the result links; the chosen video is extracted like any other
+        'cachedir': False,
+        'retries': 5,
+        'socket_timeout': 15
+    }
+}
+
+def slim_video_info(info: dict):
+    """Keeps only the fields the bot uses, so cached entries stay small."""
+    if not info:
+        return None
+    return {
+        'id': info.get('id'),
+        'title': info.get('title'),
+        'channel': info.get('channel') or info.get('uploader'),
+        'webpage_url': info.get('webpage_url'),
+        'duration': info.get('duration'),
+        'is_live': info.get('is_live', False),
+        'url': info.get('url'),
+        'acodec': info.get('acodec')
     }
 
-    loop = asyncio.get_event_loop()
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        # Extract details for a single video
+def slim_search_info(info: dict):
+    """Keeps the fields of flat search results used to pick one."""
+    return {
+        'entries': [
+            {
+                'id': entry.get('id'),
+                'url': entry.get('url'),
+                'title': entry.get('title'),
+                'channel': entry.get('channel') or entry.get('uploader'),
+                'duration': entry.get('duration')
+            }
+            for entry in (info or {}).get('entries') or [] if entry
+        ]
+    }
+
+def slim_playlist_info(info: dict):
+    """Keeps a flat playlist's title and entry URLs; a single video is slimmed like any other."""
+    if not info or 'entries' not in info:
+        return slim_video_info(info)
+    return {
+        'title': info.get('title'),
+        'entries': [{'url': entry.get('url'), 'title': entry.get('title')} if entry else None for entry in info['entries'] or []]
+    }
+
+# YoutubeDL instances built once per extraction worker process; the bot process builds one per call instead
+downloaders = {}
+
+def warm_extraction_worker():
+    """Runs once in each extraction worker process, so the first extraction does not pay for setup."""
+    for kind, options in EXTRACTION_OPTIONS.items():
+        downloaders[kind] = yt_dlp.YoutubeDL(options)
+
+def run_extraction(kind: str, url: str):
+    """Runs one yt-dlp extraction on the extraction executor and returns only the fields the bot uses."""
+    ydl = downloaders.get(kind) or yt_dlp.YoutubeDL(EXTRACTION_OPTIONS[kind])
+    info = ydl.extract_info(url, download=False)
+    if kind == 'search':
+        return slim_search_info(info)
+    return slim_playlist_info(info) if kind == 'playlist' else slim_video_info(info)
+
+def start_extraction_workers(workers: int = EXTRACTION_WORKERS):
+    """Switches extraction to a pool of warm worker processes.
+
+    Called before the bot starts, while the process has a single thread, so workers can be forked
+    safely and inherit the already imported yt-dlp. Submitting one job per worker starts them all now.
+    """
+    global executor
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=warm_extraction_worker)
+    extraction_scheduler.concurrency = workers
+    for future in [executor.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    print(f"{bcolors.OKBLUE}Started {workers} extraction worker processes{bcolors.DEFAULT}")
+
+async def extract_playlist_videos_async(query: str, guild_id: int = None):
+    """Extracts the video URLs from a playlist without resolving each video."""
+    logger.info(f"Started extracting playlist: {query}")
+    return await extraction_scheduler.run(guild_id, ExtractionScheduler.INTERACTIVE, run_extraction, 'playlist', query)
+
+async def extract_video_info_async(video_url: str, guild_id: int = None, priority: int = ExtractionScheduler.INTERACTIVE):
+    """Extracts details for an individual video, shared across guilds through the extraction cache."""
+    async def extract():
         logger.info(f"Extracting video: {video_url}")
-        return await loop.run_in_executor(executor, ydl.extract_info, video_url, False)
+        info = await extraction_scheduler.run(
+            guild_id, priority, run_extraction, 'video', video_url, waiting=extraction_cache.waiters(video_url)
+        )
+        track_index.add_video(info)
+        return info
+
+    return await extraction_cache.get(video_url, extract, guild_id=guild_id)
+
+async def resolve_playlist_async(entries, on_resolved, on_progress=None, concurrency=PLAYLIST_CONCURRENCY, guild_id: int = None) -> int:
+    """Resolves flat playlist entries in parallel and hands them back in playlist order.
+
+    At most `concurrency` entries are extracted at once, as background work for `guild_id`. Unavailable entries are skipped.
+    `on_resolved(video_url, video_info)` is awaited for each available video in playlist order, and
+    `on_progress(done, total)` after every entry. Returns the number of videos resolved.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(idx, entry):
+        if entry is None or not entry.get('url'):
+            logger.warning(f"Video at position {idx+1} in the playlist is unavailable and will be skipped.")
+            return None
+        async with semaphore:
+            try:
+                video_info = await asyncio.wait_for(
+                    extract_video_info_async(entry['url'], guild_id, ExtractionScheduler.BACKFILL), PLAYLIST_ENTRY_TIMEOUT
+                )
+            except Exception as e:
+                logger.warning(f"Video at position {idx+1} in the playlist failed to extract and will be skipped: {e}")
+                return None
+        if not video_info:
+            logger.warning(f"Video at position {idx+1} in the playlist is unavailable and will be skipped.")
+        return video_info
+
+    tasks = [asyncio.create_task(resolve(idx, entry)) for idx, entry in enumerate(entries)]
+    resolved = 0
+    try:
+        for done, task in enumerate(tasks, start=1):
+            video_info = await task
+            if video_info:
+                await on_resolved(entries[done - 1]['url'], video_info)
+                resolved += 1
+            if on_progress:
+                await on_progress(done, len(tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return resolved
+
+class PlaylistStream:
+    """Reads a playlist's flat entries on a background thread, a page at a time, as YouTube serves them.
+
+    At most one page waits to be taken, so yt-dlp only fetches further into a channel with thousands
+    of uploads, or an endless mix, as fast as the bot consumes it. Iterate to get lists of entries.
+    """
+    def __init__(self, query: str, page_size: int = PLAYLIST_PAGE_SIZE):
+        self.query = query
+        self.page_size = page_size
+        self.title = None
+        self.seen = 0
+        self.pages = asyncio.Queue(maxsize=1)
+        self.stopped = threading.Event()
+        self.loop = None
+
+    async def start(self) -> bool:
+        """Starts reading; returns whether the query is a playlist at all."""
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self.produce, name='playlist-stream', daemon=True).start()
+        kind, value = await self.pages.get()
+        if kind == 'error':
+            raise value
+        if kind == 'playlist':
+            self.title = value
+            return True
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> list:
+        kind, value = await self.pages.get()
+        if kind == 'page':
+            self.seen += len(value)
+            return value
+        if kind == 'error':
+            raise value
+        raise StopAsyncIteration
+
+    def close(self):
+        self.stopped.set()
+
+    def emit(self, kind: str, value=None):
+        """Hands an item to the event loop, waiting while the previous page has not been taken."""
+        if self.stopped.is_set():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.pages.put((kind, value)), self.loop)
+        while not self.stopped.is_set():
+            try:
+                return future.result(timeout=1)
+            except TimeoutError:
+                continue
+        future.cancel()
+
+    def produce(self):
+        try:
+            with yt_dlp.YoutubeDL(EXTRACTION_OPTIONS['playlist']) as ydl:
+                # Unprocessed, so `entries` stays a generator that fetches pages as it is iterated
+                info = ydl.extract_info(self.query, download=False, process=False)
+                for _ in range(3):  # Channel pages redirect to their videos tab
+                    if not info or info.get('_type') not in ('url', 'url_transparent'):
+                        break
+                    info = ydl.extract_info(info['url'], download=False, process=False)
+                if not info or 'entries' not in info:
+                    self.emit('single')
+                    return
+                self.emit('playlist', info.get('title'))
+
+                page = []
+                for entry in info['entries'] or []:
+                    if self.stopped.is_set():
+                        return
+                    page.append({'url': entry.get('url'), 'title': entry.get('title')} if entry else None)
+                    if len(page) >= self.page_size:
+                        self.emit('page', page)
+                        page = []
+                if page:
+                    self.emit('page', page)
+        except Exception as e:
+            self.emit('error', e)
+        finally:
+            self.emit('end')
+
+async def load_playlist_stream(stream: PlaylistStream, guild_data, on_resolved, on_progress=None, window: int = PLAYLIST_WINDOW) -> int:
+    """Resolves a streamed playlist page by page, pausing while `window` tracks are already queued.
+
+    `on_resolved` is awaited as in `resolve_playlist_async`, and `on_progress(seen, None)` after each
+    page since the total is not known up front. Returns the number of videos resolved.
+    """
+    added = 0
+    try:
+        async for page in stream:
+            while len(guild_data.pod_queue) >= window:
+                guild_data.queue_space.clear()
+                await guild_data.queue_space.wait()
+            added += await resolve_playlist_async(page, on_resolved, guild_id=guild_data.guild_id)
+            if on_progress:
+                await on_progress(stream.seen, None)
+    finally:
+        stream.close()
+    return added
+
+async def extract_stream_async(video_url: str, guild_id: int = None):
+    """Resolves the stream URL and codec for a video page URL, reusing a cached one until it nears expiry."""
+    async def extract():
+        logger.info(f"Resolving stream: {video_url}")
+        info = await extraction_scheduler.run(
+            guild_id, ExtractionScheduler.NOW, run_extraction, 'stream', video_url, waiting=extraction_cache.waiters(video_url)
+        )
+        track_index.add_video(info)
+        return info
+
+    info = await extraction_cache.get(video_url, extract, need_stream=True, guild_id=guild_id)
+    return info if info and info.get('url') else None
+
+def is_url(query: str) -> bool:
+    return '://' in query or query.lower().startswith(('www.', 'youtube.com/', 'youtu.be/', 'm.youtube.com/', 'music.youtube.com/'))
+
+async def resolve_search(query: str, guild_id: int = None) -> str | None:
+    """Turns words typed into /play into a link: the best match in the track index, otherwise YouTube's top result."""
+    matches = await track_index.search(query, limit=1)
+    if matches:
+        track_index.stats['local_matches'] += 1
+        logger.info(f"Matched '{query}' to {matches[0]['title']} in the track index")
+        return matches[0]['url']
+    track_index.stats['network_searches'] += 1
+    results = await extraction_scheduler.run(guild_id, ExtractionScheduler.INTERACTIVE, run_extraction, 'search', f"ytsearch1:{query}")
+    entries = [entry for entry in (results or {}).get('entries') or [] if entry and entry.get('url')]
+    return entries[0]['url'] if entries else None
+
+def describe_choice(entry: dict) -> str:
+    """An autocomplete label such as "Episode 12 - Some Channel (1:02:03)", within Discord's 100 characters."""
+    label = entry['title'] if entry['kind'] == 'video' else f"Playlist: {entry['title']}"
+    suffix = f" - {entry['channel']}" if entry['channel'] else ""
+    if entry['duration']:
+        minutes, seconds = divmod(int(entry['duration']), 60)
+        hours, minutes = divmod(minutes, 60)
+        suffix += f" ({hours}:{minutes:02d}:{seconds:02d})" if hours else f" ({minutes}:{seconds:02d})"
+    if len(label) + len(suffix) > 100:
+        label = label[:max(100 - len(suffix), 1) - 1] + '…'
+    return (label + suffix)[:100]
+
+SPOTIFY_LINK = re.compile(r'(?:open\.spotify\.com/(?:intl-[\w-]+/)?|spotify:)(show|episode|playlist)[/:]([A-Za-z0-9]{22})')
+
+spotify = None  # Built on first use
+
+def parse_spotify_link(query: str) -> tuple | None:
+    """Returns ('show' | 'episode' | 'playlist', id) for a Spotify link or URI, otherwise None."""
+    match = SPOTIFY_LINK.search(query)
+    return (match.group(1), match.group(2)) if match else None
+
+def spotify_client() -> spotipy.Spotify | None:
+    global spotify
+    if spotify is None and SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
+        spotify = spotipy.Spotify(
+            auth_manager=SpotifyClientCredentials(client_id=SPOTIFY_CLIENT_ID, client_secret=SPOTIFY_CLIENT_SECRET),
+            requests_timeout=10
+        )
+        spotify.prefix = SPOTIFY_API_URL
+    return spotify
+
+def spotify_item(entry: dict, show_name: str = None) -> dict | None:
+    """Flattens a Spotify episode, track or playlist item to what matching needs; local files and removed items give None."""
+    if entry and entry.get('type') not in ('episode', 'track'):
+        entry = entry.get('item') or entry.get('track')  # Playlist items wrap the episode or track
+    if not entry or not entry.get('id'):
+        return None
+    if entry.get('type') == 'track':
+        creator = ', '.join(artist['name'] for artist in entry.get('artists') or [])
+    else:
+        creator = (entry.get('show') or {}).get('name') or show_name
+    return {'id': entry['id'], 'name': entry.get('name') or '', 'creator': creator, 'duration': (entry.get('duration_ms') or 0) / 1000 or None}
+
+async def fetch_spotify_items(kind: str, spotify_id: str, page_concurrency: int = SPOTIFY_PAGE_CONCURRENCY) -> tuple:
+    """Returns the title and items of a Spotify show, episode or playlist.
+
+    The show or playlist itself comes with its first page; once that gives the total, the remaining
+    pages are fetched `page_concurrency` at a time in the largest size Spotify serves.
+    spotipy is blocking, so every request runs on a thread.
+    """
+    client = spotify_client()
+    if kind == 'episode':
+        episode = spotify_item(await asyncio.to_thread(client.episode, spotify_id, market=SPOTIFY_MARKET))
+        return episode['name'], [episode]
+
+    if kind == 'show':
+        show = await asyncio.to_thread(client.show, spotify_id, market=SPOTIFY_MARKET)
+        title, first = show['name'], show['episodes']
+        fetch_page = lambda offset: client.show_episodes(spotify_id, limit=SPOTIFY_PAGE_SIZES['show'], offset=offset, market=SPOTIFY_MARKET)
+    else:
+        playlist = await asyncio.to_thread(client.playlist, spotify_id, market=SPOTIFY_MARKET, additional_types=('track', 'episode'))
+        title, first = playlist['name'], playlist.get('tracks') or playlist.get('items')
+        fetch_page = lambda offset: client.playlist_items(
+            spotify_id, limit=SPOTIFY_PAGE_SIZES['playlist'], offset=offset, market=SPOTIFY_MARKET, additional_types=('track', 'episode')
+        )
+    semaphore = asyncio.Semaphore(page_concurrency)
+
+    async def fetch(offset):
+        async with semaphore:
+            return await asyncio.to_thread(fetch_page, offset)
+
+    offsets = range(len(first['items']), first['total'] or 0, SPOTIFY_PAGE_SIZES[kind])
+    pages = [first, *await asyncio.gather(*(fetch(offset) for offset in offsets))]
+    items = [spotify_item(entry, title) for page in pages for entry in page['items']]
+    return title, [item for item in items if item]
+
+def pick_search_result(entries: list, duration: float | None) -> dict | None:
+    """Takes YouTube's highest ranked result whose length matches `duration`, or its top result when none does."""
+    candidates = [entry for entry in entries if entry and entry.get('id')]
+    if not candidates or not duration:
+        return candidates[0] if candidates else None
+    tolerance = max(duration * SPOTIFY_DURATION_TOLERANCE, 30)
+    return next((entry for entry in candidates if entry.get('duration') and abs(entry['duration'] - duration) <= tolerance), candidates[0])
+
+async def match_spotify_item(item: dict, guild_id: int = None) -> dict | None:
+    """Searches YouTube for a Spotify item and returns the chosen video's info."""
+    query = f"{item['creator']} {item['name']}" if item['creator'] else item['name']
+    results = await extraction_scheduler.run(
+        guild_id, ExtractionScheduler.BACKFILL, run_extraction, 'search', f"ytsearch{SPOTIFY_SEARCH_RESULTS}:{query}"
+    )
+    entry = pick_search_result((results or {}).get('entries') or [], item['duration'])
+    if entry is None:
+        return None
+    return {
+        'id': entry['id'],
+        'title': entry.get('title'),
+        'channel': entry.get('channel'),
+        'duration': entry.get('duration'),
+        'webpage_url': entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}"
+    }
+
+async def resolve_spotify_items(items, on_resolved, on_progress=None, concurrency=SPOTIFY_MATCH_CONCURRENCY, guild_id: int = None) -> int:
+    """Matches Spotify items to YouTube videos and hands them back in order, like `resolve_playlist_async`.
+
+    Saved matches are looked up in one query; the rest are searched `concurrency` at a time and saved.
+    Only the video page is needed to queue a track, so matched videos are not extracted until they play.
+    """
+    spotify_stats['imports'] += 1
+    spotify_stats['items'] += len(items)
+    saved = await track_index.lookup_matches([item['id'] for item in items])
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def match(idx, item):
+        if item['id'] in saved:
+            spotify_stats['cached'] += 1
+            return saved[item['id']]
+        async with semaphore:
+            try:
+                video_info = await asyncio.wait_for(match_spotify_item(item, guild_id), PLAYLIST_ENTRY_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Item {idx+1} ({item['name']}) could not be searched on YouTube and will be skipped: {e}")
+                video_info = None
+        if video_info is None:
+            spotify_stats['unmatched'] += 1
+            return None
+        spotify_stats['searched'] += 1
+        track_index.add_match(item['id'], video_info)
+        return video_info
+
+    tasks = [asyncio.create_task(match(idx, item)) for idx, item in enumerate(items)]
+    resolved = 0
+    try:
+        for done, task in enumerate(tasks, start=1):
+            video_info = await task
+            if video_info:
+                await on_resolved(video_info['webpage_url'], video_info)
+                resolved += 1
+            if on_progress:
+                await on_progress(done, len(tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return resolved
+
+def is_single_video_url(query: str) -> bool:
+    """True for a link to one YouTube video, which needs no playlist extraction first."""
+    return 'list=' not in query and ExtractionCache.key_for(query) != query
+
+async def join_voice_channel(guild: discord.Guild, channel):
+    if not guild.voice_client:
+        await channel.connect()
+    elif guild.voice_client.channel != channel:
+        await guild.voice_client.move_to(channel)
 
 @bot.tree.command()
-@app_commands.describe(query="Provide a YouTube link (video or playlist)")
+@app_commands.describe(query="A YouTube link (video or playlist), a Spotify show, episode or playlist, or words to search for")
 async def play(interaction: discord.Interaction, query: str):
+    requested_at = time.perf_counter()
     if not await is_dj_or_admin(interaction):
         await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
         return
@@ -297,85 +2402,173 @@ async def play(interaction: discord.Interaction, query: str):
     if interaction.user.voice is None:
         await interaction.response.send_message("You need to be in a voice channel to play music.", ephemeral=True)
         return
-    
-    guild_data = bot.get_guild_data(interaction.guild.id)
-
-    voice_channel = interaction.user.voice.channel
-    if not interaction.guild.voice_client:
-        await voice_channel.connect()
-    elif interaction.guild.voice_client.channel != voice_channel:
-        await interaction.guild.voice_client.move_to(voice_channel)
 
+    # Acknowledge first: connecting to voice can take longer than the interaction deadline
     await interaction.response.defer(ephemeral=True)
+    guild_data = bot.get_guild_data(interaction.guild.id)
+
+    # Joining voice overlaps with resolving the query; playback only waits for it when it is about to start
+    voice_task = asyncio.create_task(join_voice_channel(interaction.guild, interaction.user.voice.channel))
+    voice_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    await restore_guild_state(interaction.guild.id)
 
     logger.info(f"Received query: {query}")
 
     try:
-        # First, extract the list of video URLs (without full details)
-        playlist_info = await extract_playlist_videos_async(query)
-
-        if 'entries' in playlist_info:  # It's a playlist
-            playlist_title = playlist_info.get('title', 'Unknown Playlist')
+        # Shows and playlists on Spotify are loaded like YouTube playlists; an episode is matched and played as a video
+        spotify_link = parse_spotify_link(query)
+        spotify_items = None
+        if spotify_link:
+            if spotify_client() is None:
+                await interaction.followup.send("Spotify links are not enabled on this bot.", ephemeral=True)
+                return
+            try:
+                playlist_title, spotify_items = await fetch_spotify_items(*spotify_link)
+            except spotipy.SpotifyException as e:
+                logger.warning(f"Failed to load {query} from Spotify: {e}")
+                await interaction.followup.send("Could not load that Spotify link.", ephemeral=True)
+                return
+            if spotify_link[0] == 'episode':
+                matched = []
+
+                async def keep_match(video_url, video_info):
+                    matched.append(video_url)
+
+                await resolve_spotify_items(spotify_items, keep_match, guild_id=interaction.guild.id)
+                if not matched:
+                    await interaction.followup.send(f"Could not find {playlist_title} on YouTube.", ephemeral=True)
+                    return
+                query, spotify_items = matched[0], None
+
+        # Words instead of a link are looked up in the track index, then on YouTube
+        elif not is_url(query):
+            resolved = await resolve_search(query, interaction.guild.id)
+            if not resolved:
+                await interaction.followup.send(f"No results for {query}.", ephemeral=True)
+                return
+            logger.info(f"Resolved '{query}' to {resolved}")
+            query = resolved
+
+        # A link to one video goes straight to a full extraction; anything else may be a playlist
+        is_playlist = spotify_items is not None
+        stream = None
+        if not is_playlist and not is_single_video_url(query):
+            if PLAYLIST_STREAMING:
+                stream = PlaylistStream(query)
+                is_playlist = await stream.start()
+                playlist_title = stream.title
+            else:
+                # First, extract the list of video URLs (without full details)
+                playlist_info = await extract_playlist_videos_async(query, interaction.guild.id)
+                is_playlist = bool(playlist_info) and 'entries' in playlist_info
+                if is_playlist:
+                    playlist_title = playlist_info.get('title')
+                elif playlist_info and playlist_info.get('url'):
+                    # Already a full single-video extraction, so the lookups below are cache hits
+                    extraction_cache.put(extraction_cache.key_for(query), playlist_info)
+
+        if is_playlist:
+            playlist_title = playlist_title or 'Unknown Playlist'
             await interaction.followup.send(f"Loading playlist: {playlist_title}...", ephemeral=True)
+            progress_message = await interaction.followup.send(f"Loading playlist: {playlist_title}...", ephemeral=True, wait=True)
 
             first_song = None
+            loop = asyncio.get_running_loop()
+            last_report = loop.time()
 
-            # Process each video individually by extracting full details
-            for idx, entry in enumerate(playlist_info['entries']):
-                if entry is None or not entry.get('url'):
-                    logger.warning(f"Video at position {idx+1} in the playlist is unavailable and will be skipped.")
-                    continue
-
-                video_url = entry['url']
-                video_info = await extract_video_info_async(video_url)  # Fetch full video details
-                video_title = video_info.get('title', 'Unknown Title')
+            async def queue_entry(video_url, video_info):
+                nonlocal first_song
+                pod_info = Track.from_info(video_info, video_url)
 
-                pod_info = {
-                    'name': video_title,
-                    'url': video_info.get('url'),
-                    'is_live': video_info.get('is_live', False)
-                }
-
-                guild_data['pod_queue'].append(pod_info)
+                # Play the first available song immediately if nothing is currently playing
+                if first_song is None and not guild_data.current_pod:
+                    await voice_task
+                    guild_data.current_pod = pod_info
+                    first_song = pod_info
+                    await play_podcast(interaction, requested_at=requested_at)
+                else:
+                    guild_data.pod_queue.append(pod_info)
+                state_store.mark_dirty(interaction.guild.id)
 
                 # Log each song added to the queue
-                logger.info(f"Added {video_title} to the queue")
-
-                # Update the queue message after each addition
+                logger.info(f"Added {pod_info.name} to the queue")
+
+            async def report_progress(done, total):
+                nonlocal last_report
+                now = loop.time()
+                if (total is None or done < total) and now - last_report < PLAYLIST_PROGRESS_INTERVAL:
+                    return
+                last_report = now
+                progress = f"{done}/{total}" if total is not None else f"{done} so far"
+                try:
+                    await progress_message.edit(content=f"Loading playlist: {playlist_title}... ({progress})")
+                except discord.HTTPException as e:
+                    logger.warning(f"Failed to update playlist progress: {e}")
                 await update_queue_message(interaction)
 
-                # Play the first song immediately if nothing is currently playing
-                if idx == 0 and not guild_data['current_pod']:
-                    guild_data['current_pod'] = pod_info
-                    first_song = pod_info
-                    await play_podcast(interaction)
+            # Resolve entries in parallel; they are still queued in playlist order
+            started = loop.time()
+            if stream:
+                load = load_playlist_stream(stream, guild_data, queue_entry, report_progress)
+            elif spotify_items is not None:
+                entries = spotify_items
+                load = resolve_spotify_items(entries, queue_entry, report_progress, guild_id=interaction.guild.id)
+            else:
+                entries = list(playlist_info['entries'] or [])
+                load = resolve_playlist_async(entries, queue_entry, report_progress, guild_id=interaction.guild.id)
+            load_task = asyncio.create_task(load)
+            guild_data.playlist_tasks.add(load_task)
+            try:
+                added = await load_task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # Stopped by /stop or /clear_queue
+                await interaction.followup.send(f"Stopped loading playlist {playlist_title}.", ephemeral=True)
+                return
+            except QueueFull:
+                await interaction.followup.send(
+                    f"The queue is full ({MAX_QUEUE_LENGTH} tracks), so the rest of {playlist_title} was not added.", ephemeral=True
+                )
+                await update_queue_message(interaction)
+                return
+            finally:
+                guild_data.playlist_tasks.discard(load_task)
+            total = stream.seen if stream else len(entries)
+            track_index.add_playlist(query, playlist_title)
+            logger.info(f"Loaded {added}/{total} videos from {playlist_title} in {loop.time() - started:.1f}s")
 
             if first_song:
-                await interaction.followup.send(f"Now playing: {first_song['name']}", ephemeral=True)
+                await interaction.followup.send(f"Now playing: {first_song.name}", ephemeral=True)
             else:
-                await interaction.followup.send(f"Playlist {playlist_title} has been loaded into the queue.", ephemeral=True)
+                await interaction.followup.send(f"Playlist {playlist_title} has been loaded into the queue ({added} videos).", ephemeral=True)
 
         else:  # Single video
-            video_info = await extract_video_info_async(query)
-            video_title = video_info.get('title', query)
-            is_live = video_info.get('is_live', False)
+            video_info = await extract_video_info_async(query, interaction.guild.id)
 
-            if not video_info.get('url'):
+            if not video_info or not video_info.get('url'):
                 await interaction.followup.send("Failed to extract video URL. Please check the link.", ephemeral=True)
                 return
 
-            pod_info = {
-                'name': video_title,
-                'url': video_info.get('url'),
-                'is_live': is_live
-            }
+            pod_info = Track.from_info(video_info, query)
+            if not video_info.get('title'):
+                pod_info.name = query
 
-            if guild_data['current_pod']:
-                guild_data['pod_queue'].append(pod_info)
-                await interaction.followup.send(f"Added to queue: {pod_info['name']}", ephemeral=True)
+            if guild_data.current_pod:
+                try:
+                    guild_data.pod_queue.append(pod_info)
+                except QueueFull:
+                    await interaction.followup.send(
+                        f"The queue is full ({MAX_QUEUE_LENGTH} tracks). Remove some tracks before adding more.", ephemeral=True
+                    )
+                    return
+                state_store.mark_dirty(interaction.guild.id)
+                await interaction.followup.send(f"Added to queue: {pod_info.name}", ephemeral=True)
             else:
-                guild_data['current_pod'] = pod_info
-                await play_podcast(interaction)
+                await voice_task
+                guild_data.current_pod = pod_info
+                state_store.mark_dirty(interaction.guild.id)
+                await play_podcast(interaction, requested_at=requested_at)
 
         await update_queue_message(interaction)
 
@@ -383,6 +2576,23 @@ async def play(interaction: discord.Interaction, query: str):
         await interaction.followup.send(f"An error occurred - Check the bot logs.", ephemeral=True)
         logger.error(f"Error in play command: {e}")
 
+
+@play.autocomplete('query')
+async def play_autocomplete(interaction: discord.Interaction, current: str) -> list:
+    """Suggests indexed tracks as the user types; a pasted link is left alone."""
+    if is_url(current):
+        return []
+    started = time.perf_counter()
+    track_index.stats['autocompletes'] += 1
+    try:
+        entries = await asyncio.wait_for(track_index.search(current), AUTOCOMPLETE_TIMEOUT)
+    except (asyncio.TimeoutError, sqlite3.Error) as e:
+        logger.warning(f"Autocomplete for '{current}' failed: {e!r}")
+        return []
+    finally:
+        autocomplete_seconds.observe(time.perf_counter() - started)
+    return [app_commands.Choice(name=describe_choice(entry), value=entry['url'][:100]) for entry in entries if len(entry['url']) <= 100]
+
 @bot.tree.command()
 async def pause(interaction: discord.Interaction):
     if not await is_dj_or_admin(interaction):
@@ -417,10 +2627,93 @@ async def clear_queue(interaction: discord.Interaction):
         await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
         return
     guild_data = bot.get_guild_data(interaction.guild.id)
-    guild_data['pod_queue'].clear()
+    guild_data.pod_queue.clear()
+    discard_prefetch(guild_data)
+    # The current track keeps playing, so a stream lookup it is waiting on must still run
+    cancel_pending_extractions(guild_data, (ExtractionScheduler.INTERACTIVE, ExtractionScheduler.BACKFILL))
+    state_store.mark_dirty(interaction.guild.id)
     await interaction.response.send_message("Cleared the queue.", ephemeral=True)
     await update_queue_message(interaction)
 
+@bot.tree.command(name='queue')
+@app_commands.describe(count="How many upcoming tracks to show")
+async def show_queue(interaction: discord.Interaction, count: app_commands.Range[int, 1, 25] = 10):
+    """Shows the next tracks in the queue."""
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+    guild_data = bot.get_guild_data(interaction.guild.id)
+
+    if not guild_data.pod_queue:
+        await interaction.response.send_message("The queue is currently empty.", ephemeral=True)
+        return
+
+    lines = [f"{idx}. {pod.name}" for idx, pod in enumerate(guild_data.pod_queue.peek(count), start=1)]
+    if len(guild_data.pod_queue) > count:
+        lines.append(f"...and {len(guild_data.pod_queue) - count} more.")
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+async def queue_changed(interaction: discord.Interaction):
+    """Refreshes the prefetched next track, the saved state and the queue message after the queue was reordered."""
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    if guild_data.current_pod:
+        start_prefetch(guild_data)
+    state_store.mark_dirty(interaction.guild.id)
+    await update_queue_message(interaction)
+
+@bot.tree.command()
+@app_commands.describe(position="Position of the track in the queue")
+async def remove(interaction: discord.Interaction, position: int):
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+    guild_data = bot.get_guild_data(interaction.guild.id)
+
+    if not 1 <= position <= len(guild_data.pod_queue):
+        await interaction.response.send_message(f"There is no track at position {position}.", ephemeral=True)
+        return
+
+    pod = guild_data.pod_queue.remove(position - 1)
+    await interaction.response.send_message(f"Removed from queue: {pod.name}", ephemeral=True)
+    await queue_changed(interaction)
+
+@bot.tree.command()
+@app_commands.describe(position="Position of the track in the queue", new_position="Position to move it to")
+async def move(interaction: discord.Interaction, position: int, new_position: int):
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+    guild_data = bot.get_guild_data(interaction.guild.id)
+
+    for pos in (position, new_position):
+        if not 1 <= pos <= len(guild_data.pod_queue):
+            await interaction.response.send_message(f"There is no track at position {pos}.", ephemeral=True)
+            return
+
+    pod = guild_data.pod_queue.move(position - 1, new_position - 1)
+    await interaction.response.send_message(f"Moved {pod.name} to position {new_position}.", ephemeral=True)
+    await queue_changed(interaction)
+
+@bot.tree.command()
+async def shuffle(interaction: discord.Interaction):
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    guild_data.pod_queue.shuffle()
+    await interaction.response.send_message("Shuffled the queue.", ephemeral=True)
+    await queue_changed(interaction)
+
+@bot.tree.command()
+async def dedupe(interaction: discord.Interaction):
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+    guild_data = bot.get_guild_data(interaction.guild.id)
+    removed = guild_data.pod_queue.dedupe()
+    await interaction.response.send_message(f"Removed {removed} duplicate tracks from the queue.", ephemeral=True)
+    await queue_changed(interaction)
+
 @bot.tree.command()
 async def refresh(interaction: discord.Interaction):
     """Command to delete and recreate the persistent queue message."""
@@ -430,13 +2723,13 @@ async def refresh(interaction: discord.Interaction):
     
     guild_data = bot.get_guild_data(interaction.guild.id)
 
-    if guild_data['queue_message']:
+    if guild_data.queue_message:
         try:
-            await guild_data['queue_message'].delete()
+            await guild_data.queue_message.delete()
         except Exception as e:
             print(f"{bcolors.FAIL}Error deleting queue message: {e}{bcolors.DEFAULT}")
     
-    guild_data['queue_message'] = None
+    guild_data.queue_message = None
     await update_queue_message(interaction)
     await interaction.response.send_message("The persistent queue message has been refreshed.", ephemeral=True)
 
@@ -450,20 +2743,84 @@ async def set_channel(interaction: discord.Interaction, channel: discord.TextCha
     guild_data = bot.get_guild_data(interaction.guild.id)
 
     # Clear messages in the old channel
-    if guild_data['queue_message']:
+    if guild_data.queue_message:
         try:
-            await guild_data['queue_message'].delete()
+            await guild_data.queue_message.delete()
         except:
             pass  # In case the message was already deleted
 
-    guild_data['assigned_channel_id'] = channel.id
+    guild_data.assigned_channel_id = channel.id
     await interaction.response.send_message(f"The bot channel has been set to {channel.mention}.", ephemeral=True)
     
     # Update queue message in the new channel
-    guild_data['queue_message'] = None
+    guild_data.queue_message = None
+    state_store.mark_dirty(interaction.guild.id)
     await update_queue_message(interaction)
 
-bot.run(DISCORD_BOT_TOKEN)
+@bot.tree.command()
+async def stats(interaction: discord.Interaction):
+    """Shows playback and cache statistics."""
+    if not await is_dj_or_admin(interaction):
+        await interaction.response.send_message("You need to be a DJ or admin to use this command.", ephemeral=True)
+        return
+
+    cache_stats = extraction_cache.stats
+    guild_extractions = extraction_scheduler.stats_for(interaction.guild.id)
+    waits = guild_extractions['waits']
+    average_wait = f"{sum(waits) / len(waits) * 1000:.0f}ms" if waits else "n/a"
+    first_audio = first_audio_stats['recent']
+    first_audio_p50, first_audio_p95 = percentile(first_audio, 0.5), percentile(first_audio, 0.95)
+    recovery_latency = recovery_stats['recent_latency']
+    average_recovery = f"{sum(recovery_latency) / len(recovery_latency) * 1000:.0f}ms" if recovery_latency else "n/a"
+    recent_gaps = playback_stats['recent_gaps']
+    totals = bot.shard_link.totals if bot.shard_link else None
+    average_gap = f"{sum(recent_gaps) / len(recent_gaps) * 1000:.0f}ms" if recent_gaps else "n/a"
+    await interaction.response.send_message(
+        f"**Extraction cache:** {len(extraction_cache.entries)}/{extraction_cache.max_entries} videos, "
+        f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['deduplicated']} deduplicated, {cache_stats['evictions']} evictions\n"
+        f"**Extractions:** {extraction_scheduler.running}/{extraction_scheduler.concurrency} running; this server has "
+        f"{extraction_scheduler.depth(interaction.guild.id)} waiting, average wait {average_wait}, "
+        f"{guild_extractions['cancelled']} dropped\n"
+        f"**Queue message:** {render_stats['requested']} updates requested, {render_stats['sent']} edits sent, "
+        f"{render_stats['unchanged']} skipped as unchanged\n"
+        f"**Track changes:** {playback_stats['transitions']} ({playback_stats['prefetched']} prefetched), "
+        f"average time to next audio {average_gap}\n"
+        f"**Stream reconnects:** {recovery_stats['recovered']}/{recovery_stats['attempts']} recovered, "
+        f"{recovery_stats['gave_up']} tracks given up, average time to resume {average_recovery}\n"
+        f"**Time to first audio:** " + (
+            f"p50 {first_audio_p50:.1f}s (target {FIRST_AUDIO_TARGET_P50:.1f}s), "
+            f"p95 {first_audio_p95:.1f}s (target {FIRST_AUDIO_TARGET_P95:.1f}s), "
+            f"{first_audio_stats['over_target']}/{first_audio_stats['requests']} requests over the p95 target\n"
+            if first_audio else "n/a\n"
+        ) +
+        f"**Audio sources ({PLAYBACK_MODE} mode):** {source_stats['copy']} Opus copied, "
+        f"{source_stats['transcode']} transcoded to Opus, {source_stats['pcm']} decoded to PCM\n"
+        f"**Audio cache:** {len(audio_cache.files)} files, {audio_cache.total_bytes / 1024 / 1024:.0f}/{audio_cache.max_bytes / 1024 / 1024:.0f} MB, "
+        f"{audio_cache.stats['hits']} hits, {audio_cache.stats['misses']} misses, {audio_cache.stats['stored']} stored, "
+        f"{audio_cache.stats['evictions']} evictions, {audio_cache.stats['failures']} failed downloads\n"
+        f"**Saved state:** {state_store.stats['flushes']} writes covering {state_store.stats['guilds_written']} guild updates "
+        f"and {state_store.stats['positions_written']} position checkpoints\n"
+        f"**Track index:** {track_index.stats['indexed']} tracks indexed, {track_index.stats['autocompletes']} autocompletes, "
+        f"{track_index.stats['local_matches']} searches matched locally, {track_index.stats['network_searches']} searched on YouTube\n"
+        f"**Spotify imports:** {spotify_stats['imports']} imports of {spotify_stats['items']} items, "
+        f"{spotify_stats['cached']} matched from saved matches, {spotify_stats['searched']} searched on YouTube, "
+        f"{spotify_stats['unmatched']} not found\n"
+        f"**Resources:** {len(bot.voice_clients)} voice sessions, {len(bot.guild_data)} guild states in memory, "
+        f"{reclaim_stats['idle_disconnects']} idle and {reclaim_stats['alone_disconnects']} empty-channel disconnects, "
+        f"{reclaim_stats['evictions']} guild states evicted" + (
+            f"\n**All processes:** {totals['reporting']}/{totals['processes']} reporting, {totals['guilds']} guilds, "
+            f"{totals['voice_sessions']} voice sessions ({totals['playing']} playing), {totals['guild_states']} guild states in memory, "
+            f"{totals['queued_tracks']} tracks queued; this is process {SHARD_PROCESS} running shards {', '.join(map(str, SHARD_IDS or []))}"
+            if totals else ""
+        ),
+        ephemeral=True
+    )
+
+if __name__ == '__main__':
+    if EXTRACTION_BACKEND == 'process':
+        start_extraction_workers()
+    bot.run(DISCORD_BOT_TOKEN)
 
 # def run_bot():
     # bot.run(DISCORD_BOT_TOKEN)
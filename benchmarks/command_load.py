@@ -0,0 +1,459 @@
+"""Load test that drives the real /set_channel, /play and /skip handlers against simulated guilds, offline.
+
+yt-dlp is replaced by a fake extractor with configurable latency and playlist sizes, and Discord by
+fake guilds, voice clients and messages. One thread reads a 20ms frame from every playing source
+per tick, like discord.py's voice players. Everything else, such as the extraction scheduler and
+cache, prefetching, playlist streaming and the queue message renderer, is the bot's own code.
+
+For each guild count, every guild sets its channel, loads a playlist with /play and skips tracks
+for `--duration` seconds. The results are printed as JSON with the same keys on every run. Pass
+an earlier run with --baseline to print the change in each number.
+
+    python -m benchmarks.command_load --guilds 1 10 100 --playlist-size 100 --output results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import discord
+
+from aquapod import main as aquapod
+from benchmarks.extraction_backends import measure_lag
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+SILENCE = b'\xf8\xff\xfe'  # An Opus frame of silence
+
+
+def video_id(guild_id, idx):
+    return f"g{guild_id:04d}e{idx:05d}"
+
+
+class FakeExtractor:
+    """Stands in for `run_extraction` and yt-dlp's lazy playlist pages. Runs on the bot's extraction threads."""
+    def __init__(self, latency, cpu, track_seconds, page_latency):
+        self.latency = latency
+        self.cpu = cpu
+        self.track_seconds = track_seconds
+        self.page_latency = page_latency
+        self.calls = {'playlist': 0, 'video': 0, 'stream': 0}
+
+    def work(self):
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        deadline = time.perf_counter() + self.cpu  # yt-dlp's parsing, which holds the GIL
+        while time.perf_counter() < deadline:
+            pass
+
+    def run_extraction(self, kind, url):
+        self.calls[kind] += 1
+        self.work()
+        video = url.rsplit('=', 1)[-1]
+        return {
+            'id': video, 'title': f"Episode {video}", 'channel': "Fake", 'webpage_url': url,
+            'duration': self.track_seconds, 'is_live': False, 'acodec': 'opus',
+            'url': f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time()) + 21600}&id={video}"
+        }
+
+    def youtube_dl(self):
+        extractor = self
+
+        class FakeYoutubeDL:
+            def __init__(self, options):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download, process):
+                extractor.calls['playlist'] += 1
+                extractor.work()
+                guild_id, size = (int(part) for part in url.rsplit('=', 1)[-1].split('-'))
+
+                def entries():
+                    for idx in range(size):
+                        if idx and idx % 100 == 0:
+                            time.sleep(extractor.page_latency)  # YouTube serves playlists 100 entries at a time
+                        video = video_id(guild_id, idx)
+                        yield {'url': f"https://www.youtube.com/watch?v={video}", 'title': f"Episode {video}"}
+                return {'title': f"Playlist {guild_id}", 'entries': entries()}
+
+        return FakeYoutubeDL
+
+
+class FakeSource(discord.AudioSource):
+    def __init__(self, frames):
+        self.frames = frames
+
+    def read(self):
+        if self.frames <= 0:
+            return b''
+        self.frames -= 1
+        return SILENCE
+
+    def is_opus(self):
+        return True
+
+
+class VoiceNetwork:
+    """One thread playing every fake voice client, a frame per client every 20ms."""
+    def __init__(self):
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='fake-voice', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while not self.stopped.is_set():
+            with self.lock:
+                clients = list(self.clients)
+            for client in clients:
+                client.tick()
+            next_tick += FRAME_SECONDS
+            time.sleep(max(next_tick - time.perf_counter(), 0))
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+class FakeVoiceClient:
+    def __init__(self, network, guild, channel):
+        self.network = network
+        self.guild = guild
+        self.channel = channel
+        self.source = None
+        self.after = None
+        self.paused = False
+        self.stopping = False
+        self.first_frame_at = None
+
+    def play(self, source, after=None):
+        with self.network.lock:
+            self.source, self.after, self.stopping, self.paused = source, after, False, False
+            self.network.clients.add(self)
+
+    def tick(self):
+        if self.paused:
+            return
+        source, after = self.source, self.after
+        if source is None:
+            return
+        data = b'' if self.stopping else source.read()
+        if data and self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+        if not data:
+            with self.network.lock:
+                if self.source is source:
+                    self.source = None
+                    self.network.clients.discard(self)
+            if after:
+                after(None)
+
+    def is_playing(self):
+        return self.source is not None and not self.paused
+
+    def is_paused(self):
+        return self.source is not None and self.paused
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def stop(self):
+        self.stopping = True
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self):
+        self.stop()
+        self.guild.voice_client = None
+
+
+class FakeMessage:
+    ids = iter(range(1, 10 ** 12))
+
+    def __init__(self, channel, content):
+        self.id = next(FakeMessage.ids)
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(self.channel.world.api_latency)
+        self.content = content
+        self.channel.edits += 1
+        return self
+
+    async def delete(self):
+        await asyncio.sleep(self.channel.world.api_latency)
+
+
+class FakeTextChannel:
+    def __init__(self, world, guild, channel_id):
+        self.world = world
+        self.guild = guild
+        self.id = channel_id
+        self.name = 'aquapod-controller'
+        self.mention = f'<#{channel_id}>'
+        self.edits = 0
+        self.sends = 0
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.world.api_latency)
+        self.sends += 1
+        return FakeMessage(self, content)
+
+
+class FakeVoiceChannel:
+    def __init__(self, world, guild):
+        self.world = world
+        self.guild = guild
+        self.members = []
+
+    async def connect(self):
+        await asyncio.sleep(self.world.api_latency)
+        self.guild.voice_client = FakeVoiceClient(self.world.network, self.guild, self)
+        if self.guild.first_client is None:
+            self.guild.first_client = self.guild.voice_client
+        return self.guild.voice_client
+
+
+class FakeGuild:
+    def __init__(self, world, guild_id):
+        self.id = guild_id
+        self.name = f"Guild {guild_id}"
+        self.voice_client = None
+        self.first_client = None
+        self.text_channel = FakeTextChannel(world, self, 10_000 + guild_id)
+        self.voice_channel = FakeVoiceChannel(world, self)
+
+
+class FakeInteraction:
+    """An interaction from an admin in the guild's voice channel; replies are discarded."""
+    def __init__(self, world, guild):
+        self.guild = guild
+        self.type = discord.InteractionType.application_command
+        self.user = SimpleNamespace(
+            voice=SimpleNamespace(channel=guild.voice_channel), roles=[],
+            guild_permissions=SimpleNamespace(administrator=True)
+        )
+        self.done = False
+        self.response = SimpleNamespace(send_message=self.reply, defer=self.defer, is_done=lambda: self.done)
+        self.followup = SimpleNamespace(send=self.follow_up)
+        self.world = world
+
+    async def reply(self, content=None, **kwargs):
+        await asyncio.sleep(self.world.api_latency)
+        self.done = True
+
+    async def defer(self, **kwargs):
+        await asyncio.sleep(self.world.api_latency)
+        self.done = True
+
+    async def follow_up(self, content=None, wait=False, **kwargs):
+        await asyncio.sleep(self.world.api_latency)
+        return FakeMessage(self.world.followups, content)
+
+
+class World:
+    def __init__(self, guild_count, api_latency):
+        self.api_latency = api_latency
+        self.network = VoiceNetwork()
+        self.guilds = [FakeGuild(self, guild_id) for guild_id in range(1, guild_count + 1)]
+        self.channels = {guild.text_channel.id: guild.text_channel for guild in self.guilds}
+        self.followups = FakeTextChannel(self, None, 0)
+
+
+async def invoke(command, interaction, *args):
+    """Runs an app command the way the command tree would, after its interaction check."""
+    if await aquapod.bot.tree.interaction_check(interaction):
+        await command.callback(interaction, *args)
+
+
+@contextlib.contextmanager
+def offline_bot(args, extractor, world):
+    """Gives the bot fresh caches and queues and the fakes, without saving state, caching audio or serving metrics."""
+    frames = int(args.track_seconds / FRAME_SECONDS)
+    replaced = {
+        'extraction_cache': aquapod.ExtractionCache(),
+        'extraction_scheduler': aquapod.ExtractionScheduler(args.extraction_threads),
+        'executor': aquapod.ThreadPoolExecutor(args.extraction_threads),
+        'state_store': aquapod.StateStore(path=''),
+        'track_index': aquapod.TrackIndex(path=''),
+        'audio_cache': aquapod.AudioCache(directory=''),
+        'run_extraction': extractor.run_extraction,
+        'create_audio_source': lambda stream, start_at=0.0, mode=None: FakeSource(frames)
+    }
+    originals = {name: getattr(aquapod, name) for name in replaced}
+    youtube_dl = aquapod.yt_dlp.YoutubeDL
+    for name, value in replaced.items():
+        setattr(aquapod, name, value)
+    aquapod.yt_dlp.YoutubeDL = extractor.youtube_dl()
+    aquapod.bot.get_channel = world.channels.get
+    aquapod.bot.guild_data.clear()
+    for key in aquapod.render_stats:
+        aquapod.render_stats[key] = 0
+    try:
+        yield
+    finally:
+        replaced['executor'].shutdown(wait=False)
+        for name, value in originals.items():
+            setattr(aquapod, name, value)
+        aquapod.yt_dlp.YoutubeDL = youtube_dl
+        del aquapod.bot.get_channel
+        aquapod.bot.guild_data.clear()
+
+
+def summarize(values, scale=1.0):
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    return {
+        'p50': round(aquapod.percentile(values, 0.5) * scale, 2),
+        'p95': round(aquapod.percentile(values, 0.95) * scale, 2),
+        'max': round(max(values) * scale, 2)
+    }
+
+
+async def run_scenario(args, guild_count):
+    extractor = FakeExtractor(args.extract_latency, args.extract_cpu, args.track_seconds, args.page_latency)
+    world = World(guild_count, args.api_latency)
+    try:
+        with offline_bot(args, extractor, world):
+            return await drive_guilds(args, world, extractor)
+    finally:
+        world.network.close()
+
+
+async def drive_guilds(args, world, extractor):
+    stop, lag = asyncio.Event(), []
+    monitor = asyncio.create_task(measure_lag(stop, lag))
+    await asyncio.gather(*(invoke(aquapod.set_channel, FakeInteraction(world, guild), guild.text_channel) for guild in world.guilds))
+
+    loads, requested = {}, {}
+
+    async def load(guild):
+        requested[guild.id] = time.perf_counter()
+        await invoke(aquapod.play, FakeInteraction(world, guild), f"https://www.youtube.com/playlist?list={guild.id}-{args.playlist_size}")
+        loads[guild.id] = time.perf_counter() - requested[guild.id]
+
+    async def skip_now_and_then(guild):
+        while True:
+            await asyncio.sleep(random.expovariate(1 / args.skip_interval))
+            await invoke(aquapod.skip, FakeInteraction(world, guild))
+
+    started = time.perf_counter()
+    plays = [asyncio.create_task(load(guild)) for guild in world.guilds]
+    skippers = [asyncio.create_task(skip_now_and_then(guild)) for guild in world.guilds]
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - started
+    # Queue message writes, counting the first send of each message
+    edits = sum(guild.text_channel.edits + guild.text_channel.sends for guild in world.guilds)
+    resolved = extractor.calls['video']
+
+    for task in skippers:
+        task.cancel()
+    await asyncio.gather(*(invoke(aquapod.stop, FakeInteraction(world, guild)) for guild in world.guilds))
+    for task in plays:
+        task.cancel()
+    await asyncio.gather(*plays, *skippers, return_exceptions=True)
+    # Let extractions already handed to threads finish while this loop is still running
+    while aquapod.extraction_scheduler.running:
+        await asyncio.sleep(0.05)
+    stop.set()
+    await monitor
+
+    guild_count = len(world.guilds)
+    first_audio = [
+        guild.first_client.first_frame_at - requested[guild.id]
+        for guild in world.guilds if guild.first_client and guild.first_client.first_frame_at
+    ]
+    # Tracks resolved per second, until every playlist finished loading or the run ended
+    load_time = max(loads.values()) if len(loads) == guild_count else elapsed
+    return {
+        'guilds': guild_count,
+        'playlists_loaded': len(loads),
+        'playlist_tracks_per_second': round(resolved / load_time, 1),
+        'playlist_load_seconds': summarize(list(loads.values())),
+        'time_to_first_audio_ms': summarize(first_audio, 1000),
+        'queue_message_edits_per_minute': round(edits / elapsed * 60, 1),
+        'queue_message_edits_per_guild_per_minute': round(edits / elapsed * 60 / guild_count, 2),
+        'queue_message_updates_requested': aquapod.render_stats['requested'],
+        'event_loop_lag_ms': summarize(lag, 1000),
+        'extractions': dict(extractor.calls)
+    }
+
+
+def flatten(result, prefix=''):
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}.')
+        elif isinstance(value, (int, float)):
+            yield f'{prefix}{key}', value
+
+
+def compare(results, baseline):
+    """Prints each number next to the baseline run with the same guild count."""
+    previous = {result['guilds']: dict(flatten(result)) for result in baseline['results']}
+    for result in results:
+        before = previous.get(result['guilds'])
+        if before is None:
+            continue
+        print(f"{result['guilds']} guilds:", file=sys.stderr)
+        for key, value in flatten(result):
+            if before.get(key):
+                print(f"  {key:<45}{before[key]:>12}{value:>12}{(value - before[key]) / before[key] * 100:>+9.1f}%", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, nargs='+', default=[1, 10, 50, 100], help="Guild counts to run")
+    parser.add_argument('--playlist-size', type=int, default=100, help="Entries in each guild's playlist")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds each guild count runs for")
+    parser.add_argument('--track-seconds', type=float, default=10, help="Length of every fake track")
+    parser.add_argument('--skip-interval', type=float, default=5, help="Average seconds between /skip in each guild")
+    parser.add_argument('--extract-latency', type=float, default=0.3, help="Average seconds a fake extraction waits on the network")
+    parser.add_argument('--extract-cpu', type=float, default=0.002, help="Seconds of CPU each fake extraction uses")
+    parser.add_argument('--page-latency', type=float, default=0.3, help="Seconds to fetch each further page of 100 playlist entries")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Seconds each Discord API call takes")
+    parser.add_argument('--extraction-threads', type=int, default=aquapod.EXTRACTION_THREADS, help="Extraction threads")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger('discord').setLevel(logging.ERROR)
+    results = []
+    # The bot prints its progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        for guild_count in args.guilds:
+            results.append(asyncio.run(run_scenario(args, guild_count)))
+            print(f"{guild_count} guilds: done", file=sys.stderr)
+
+    report = {'benchmark': 'command_load', 'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}, 'results': results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
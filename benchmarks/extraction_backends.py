@@ -0,0 +1,103 @@
+"""Compares the thread and process extraction backends on event-loop lag and throughput.
+
+By default each job is a synthetic stand-in for yt-dlp's CPU work: parsing a large player response
+and sorting its formats. Pass real video URLs with --url to run `run_extraction` instead (needs network).
+
+    python -m benchmarks.extraction_backends --jobs 200 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from aquapod import main as aquapod
+
+LAG_INTERVAL = 0.01
+
+
+def player_response(formats=400):
+    return json.dumps({
+        'videoDetails': {'title': "Episode", 'lengthSeconds': '3600'},
+        'streamingData': {'adaptiveFormats': [
+            {'itag': idx, 'bitrate': random.randint(32_000, 2_000_000), 'mimeType': 'audio/webm; codecs="opus"',
+             'url': f"https://rr1.googlevideo.com/videoplayback?expire=1&itag={idx}&sig={'x' * 200}"}
+            for idx in range(formats)
+        ]}
+    })
+
+
+PAYLOAD = player_response()
+
+
+def synthetic_extraction(kind, url):
+    """Parses and sorts a player response a few times, roughly the CPU cost of one yt-dlp extraction."""
+    for _ in range(20):
+        formats = json.loads(PAYLOAD)['streamingData']['adaptiveFormats']
+        best = max(sorted(formats, key=lambda fmt: (fmt['bitrate'], fmt['itag'])), key=lambda fmt: fmt['bitrate'])
+    return {'id': url, 'url': best['url']}
+
+
+async def measure_lag(stop: asyncio.Event, samples: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(loop.time() - expected, 0))
+
+
+async def run_backend(executor, extract, urls, concurrency):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    stop, lag = asyncio.Event(), []
+
+    async def job(url):
+        async with semaphore:
+            await loop.run_in_executor(executor, extract, 'video', url)
+
+    monitor = asyncio.create_task(measure_lag(stop, lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(job(url) for url in urls))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    lag.sort()
+    return {
+        'jobs_per_second': len(urls) / elapsed,
+        'lag_p50_ms': statistics.median(lag) * 1000,
+        'lag_p95_ms': lag[int(len(lag) * 0.95)] * 1000,
+        'lag_max_ms': lag[-1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=200, help="Extractions per backend")
+    parser.add_argument('--workers', type=int, default=4, help="Threads or processes per backend")
+    parser.add_argument('--url', action='append', help="Real video URL to extract; may be repeated")
+    args = parser.parse_args()
+
+    extract = aquapod.run_extraction if args.url else synthetic_extraction
+    sources = args.url or [f"video-{idx}" for idx in range(args.jobs)]
+    urls = [sources[idx % len(sources)] for idx in range(args.jobs)]
+    backends = {
+        'thread': lambda: ThreadPoolExecutor(args.workers),
+        'process': lambda: ProcessPoolExecutor(args.workers, initializer=aquapod.warm_extraction_worker)
+    }
+
+    print(f"{args.jobs} {'real' if args.url else 'synthetic'} extractions, {args.workers} workers")
+    print(f"{'backend':<10}{'jobs/s':>10}{'lag p50':>12}{'lag p95':>12}{'lag max':>12}")
+    for name, create in backends.items():
+        with create() as executor:
+            # Start every worker before measuring
+            list(executor.map(time.sleep, [0.05] * args.workers))
+            result = asyncio.run(run_backend(executor, extract, urls, args.workers * 2))
+        print(f"{name:<10}{result['jobs_per_second']:>10.1f}{result['lag_p50_ms']:>10.1f}ms"
+              f"{result['lag_p95_ms']:>10.1f}ms{result['lag_max_ms']:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compares CPU per concurrent stream in the 'pcm' and 'opus' playback modes.
+
+Each stream reads a source built by `create_audio_source` as fast as it can on its own thread,
+like discord.py's voice player. In 'pcm' mode the PCM frames are also encoded to Opus, which is
+what the voice client does for non-Opus sources. CPU counts both this process and FFmpeg.
+
+Needs FFmpeg on the PATH and libopus loadable by discord.py.
+
+    python -m benchmarks.playback_cpu --streams 20 --seconds 120
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import discord
+
+from aquapod.main import create_audio_source
+
+
+def make_input(path, seconds):
+    """Writes a stereo Opus/WebM test file, the format YouTube serves for most audio."""
+    subprocess.run(
+        ['ffmpeg', '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+         '-ac', '2', '-ar', '48000', '-c:a', 'libopus', '-b:a', '128k', path],
+        check=True
+    )
+
+
+def play_stream(path, mode):
+    source = create_audio_source({'url': path, 'acodec': 'opus'}, mode=mode)
+    encoder = None if source.is_opus() else discord.opus.Encoder()
+    try:
+        while data := source.read():
+            if encoder:
+                encoder.encode(data, discord.opus.Encoder.SAMPLES_PER_FRAME)
+    finally:
+        source.cleanup()
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def measure(path, mode, streams):
+    threads = [threading.Thread(target=play_stream, args=(path, mode)) for _ in range(streams)]
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return cpu_seconds() - cpu_before, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=10, help="Concurrent streams per mode")
+    parser.add_argument('--seconds', type=int, default=60, help="Length of the test audio")
+    args = parser.parse_args()
+
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'input.webm')
+        make_input(path, args.seconds)
+
+        print(f"{args.streams} streams of {args.seconds}s audio")
+        print(f"{'mode':<8}{'CPU s total':>14}{'wall s':>10}{'CPU % of a core per live stream':>34}")
+        for mode in ('pcm', 'opus'):
+            cpu, wall = measure(path, mode, args.streams)
+            per_stream = cpu / args.streams / args.seconds * 100
+            print(f"{mode:<8}{cpu:>14.2f}{wall:>10.2f}{per_stream:>33.2f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Compares the old list-of-dicts queue with TrackQueue/Track.
+
+Reports memory per 10k queued tracks and the cost of draining the queue from the front.
+
+    python -m benchmarks.queue_structures
+"""
+import time
+import tracemalloc
+
+from aquapod.main import Track, TrackQueue
+
+TRACKS = 10_000
+
+
+def track_fields(idx):
+    video_id = f"{idx:011d}"
+    return {
+        'name': f"Podcast episode {idx}",
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'id': video_id,
+        'duration': 3600,
+        'is_live': False
+    }
+
+
+def build_list(count):
+    return [track_fields(idx) for idx in range(count)]
+
+
+def build_track_queue(count):
+    return TrackQueue(Track(**track_fields(idx)) for idx in range(count))
+
+
+def measure_memory(build, count):
+    tracemalloc.start()
+    queue = build(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del queue
+    return size
+
+
+def measure_drain(build, pop, count):
+    queue = build(count)
+    started = time.perf_counter()
+    while len(queue):
+        pop(queue)
+    return time.perf_counter() - started
+
+
+def main():
+    results = {
+        'list of dicts': (build_list, lambda queue: queue.pop(0)),
+        'TrackQueue': (build_track_queue, lambda queue: queue.popleft())
+    }
+    print(f"{'structure':<15}{'bytes / 10k tracks':>20}{'drain 10k':>14}{'drain 100k':>14}")
+    for name, (build, pop) in results.items():
+        memory = measure_memory(build, TRACKS)
+        drain_small = measure_drain(build, pop, TRACKS)
+        drain_large = measure_drain(build, pop, TRACKS * 10)
+        print(f"{name:<15}{memory:>20,}{drain_small * 1000:>12.2f}ms{drain_large * 1000:>12.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
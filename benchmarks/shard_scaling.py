@@ -0,0 +1,69 @@
+"""Load test for the shard launcher: how many real-time streams one machine sustains per bot process count.
+
+A fixed number of streams is split across 1, 2, ... processes, as aquapod.launcher would split guilds.
+Each process plays its streams on threads like discord.py's voice players (see playback_cpu), as
+fast as it can. Audio seconds produced per wall second is the number of streams the processes could
+keep playing in real time. With one process the voice threads share a GIL, so that number stops
+growing at about one core; with more processes it should grow with the cores in use.
+
+Needs FFmpeg on the PATH and libopus loadable by discord.py.
+
+    python -m benchmarks.shard_scaling --streams 32 --seconds 60
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import discord
+
+from benchmarks.playback_cpu import make_input, play_stream
+
+
+def run_streams(path, mode, streams):
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+    threads = [threading.Thread(target=play_stream, args=(path, mode)) for _ in range(streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def measure(path, mode, streams, processes):
+    shares = [streams // processes + (idx < streams % processes) for idx in range(processes)]
+    with multiprocessing.get_context('spawn').Pool(processes) as pool:
+        # Start every process before measuring
+        pool.map(time.sleep, [0.2] * processes)
+        started = time.perf_counter()
+        pool.starmap(run_streams, [(path, mode, share) for share in shares])
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, default=32, help="Streams played at once, split across the processes")
+    parser.add_argument('--seconds', type=int, default=60, help="Length of the test audio")
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1, help="Largest process count tried")
+    parser.add_argument('--mode', choices=['opus', 'pcm'], default='opus', help="Playback mode of the streams")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'input.webm')
+        make_input(path, args.seconds)
+
+        print(f"{args.streams} streams of {args.seconds}s audio in {args.mode} mode, {os.cpu_count()} cores")
+        print(f"{'processes':<11}{'wall s':>10}{'real-time streams':>20}{'streams per core':>19}")
+        processes = 1
+        while processes <= args.max_processes:
+            wall = measure(path, args.mode, args.streams, processes)
+            sustained = args.streams * args.seconds / wall
+            cores = min(processes, os.cpu_count() or 1)
+            print(f"{processes:<11}{wall:>10.2f}{sustained:>20.0f}{sustained / cores:>19.0f}")
+            processes *= 2
+
+
+if __name__ == '__main__':
+    main()
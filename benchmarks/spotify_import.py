@@ -0,0 +1,242 @@
+"""Import throughput for Spotify playlists, offline against a local stand-in for the Spotify API.
+
+The stand-in serves shows, episodes and playlists over HTTP the way the Web API pages them, with a
+configurable latency per request, and the real spotipy client talks to it. YouTube searches are
+replaced by a fake extractor with its own latency, run on the bot's extraction threads. Fetching
+pages, matching items and saving matches are the bot's own code.
+
+A playlist is imported once for each match concurrency with no saved matches, then once more with
+the matches the previous runs saved, which is what importing the same playlist again costs.
+
+    python -m benchmarks.spotify_import --items 500 --concurrency 1 4 8 16
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import spotipy
+
+from aquapod import main as aquapod
+
+EPISODE_SECONDS = 1800
+
+
+def spotify_id(prefix, idx):
+    """A 22 character id like Spotify's."""
+    return f"{prefix}{idx:0>{22 - len(prefix)}}"
+
+
+def episode(show_name, idx, duration=EPISODE_SECONDS):
+    return {
+        'type': 'episode', 'id': spotify_id('ep', idx), 'name': f"Episode {idx}",
+        'duration_ms': duration * 1000, 'show': {'name': show_name}
+    }
+
+
+class SpotifyStandIn:
+    """Serves shows, episodes and playlists from memory like the Spotify Web API, on a local port.
+
+    Requests for pages larger than the API allows are refused, as Spotify does. Each request waits
+    `latency` seconds first, and is counted in `requests`.
+    """
+    LIMITS = {'episodes': 50, 'items': 100}
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.shows = {}  # Id -> (name, episodes)
+        self.playlists = {}  # Id -> (name, playlist items)
+        self.requests = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+    def add_show(self, show_id, name, episodes):
+        self.shows[show_id] = (name, [{key: value for key, value in item.items() if key != 'show'} for item in episodes])
+
+    def add_playlist(self, playlist_id, name, items):
+        self.playlists[playlist_id] = (name, [{'added_at': '2024-01-01T00:00:00Z', 'track': item} for item in items])
+
+    def client(self) -> spotipy.Spotify:
+        client = spotipy.Spotify(auth='stand-in', requests_timeout=10)
+        client.prefix = self.url
+        return client
+
+    def page(self, path, items, offset, limit):
+        following = offset + limit
+        return {
+            'href': f"{self.url}{path}?offset={offset}&limit={limit}", 'items': items[offset:following],
+            'limit': limit, 'offset': offset, 'total': len(items),
+            'next': f"{self.url}{path}?offset={following}&limit={limit}" if following < len(items) else None
+        }
+
+    def respond(self, path, query):
+        parts = path.strip('/').split('/')[1:]  # Without the version
+        offset, limit = int(query.get('offset', 0)), int(query.get('limit', 20))
+        if parts[0] == 'shows' and parts[1] in self.shows:
+            name, episodes = self.shows[parts[1]]
+            if len(parts) == 2:
+                return 200, {'id': parts[1], 'name': name, 'episodes': self.page(f"shows/{parts[1]}/episodes", episodes, 0, 50)}
+            if limit > self.LIMITS['episodes']:
+                return 400, {'error': {'status': 400, 'message': "Invalid limit"}}
+            return 200, self.page(f"shows/{parts[1]}/episodes", episodes, offset, limit)
+        if parts[0] == 'episodes':
+            for name, episodes in self.shows.values():
+                for item in episodes:
+                    if item['id'] == parts[1]:
+                        return 200, {**item, 'show': {'name': name}}
+        if parts[0] == 'playlists' and parts[1] in self.playlists:
+            name, items = self.playlists[parts[1]]
+            if len(parts) == 2:
+                return 200, {'id': parts[1], 'name': name, 'tracks': self.page(f"playlists/{parts[1]}/items", items, 0, 100)}
+            if limit > self.LIMITS['items']:
+                return 400, {'error': {'status': 400, 'message': "Invalid limit"}}
+            return 200, self.page(f"playlists/{parts[1]}/items", items, offset, limit)
+        return 404, {'error': {'status': 404, 'message': "Resource not found"}}
+
+    def handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                time.sleep(stand_in.latency)
+                url = urlparse(self.path)
+                status, body = stand_in.respond(url.path, {key: values[0] for key, values in parse_qs(url.query).items()})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeSearch:
+    """Stands in for `run_extraction` on YouTube searches. The top result is a short clip and the
+    second the full episode, so matching has to compare lengths."""
+    def __init__(self, latency):
+        self.latency = latency
+        self.searches = 0
+
+    def run_extraction(self, kind, url):
+        self.searches += 1
+        time.sleep(self.latency)
+        query = url.split(':', 1)[1]
+        video = f"{zlib.crc32(query.encode()):011d}"[-11:]
+        return {'entries': [
+            {'id': f"c{video[1:]}", 'url': f"https://www.youtube.com/watch?v=c{video[1:]}", 'title': f"{query} (clip)", 'channel': "Clips", 'duration': 60},
+            {'id': video, 'url': f"https://www.youtube.com/watch?v={video}", 'title': query, 'channel': "Podcasts", 'duration': EPISODE_SECONDS + 4}
+        ]}
+
+
+@contextlib.contextmanager
+def stand_in_bot(stand_in, search, index_path, extraction_threads):
+    """Points the bot at the stand-in and the fake search, with its own extraction threads and track index."""
+    replaced = {
+        'spotify': stand_in.client(),
+        'run_extraction': search.run_extraction,
+        'extraction_scheduler': aquapod.ExtractionScheduler(extraction_threads),
+        'executor': aquapod.ThreadPoolExecutor(extraction_threads),
+        'track_index': aquapod.TrackIndex(path=index_path, interval=0)
+    }
+    originals = {name: getattr(aquapod, name) for name in replaced}
+    for name, value in replaced.items():
+        setattr(aquapod, name, value)
+    try:
+        yield
+    finally:
+        replaced['executor'].shutdown(wait=False)
+        for name, value in originals.items():
+            setattr(aquapod, name, value)
+
+
+async def import_playlist(playlist_id, concurrency):
+    """Imports a playlist as /play does, returning the seconds spent fetching and matching and the videos matched."""
+    started = time.perf_counter()
+    _, items = await aquapod.fetch_spotify_items('playlist', playlist_id)
+    fetched = time.perf_counter()
+    matched = []
+
+    async def collect(video_url, video_info):
+        matched.append(video_url)
+
+    await aquapod.resolve_spotify_items(items, collect, concurrency=concurrency)
+    await aquapod.track_index.flush()
+    return fetched - started, time.perf_counter() - fetched, matched
+
+
+async def run(args):
+    items = [episode(f"Show {idx % 7}", idx) for idx in range(args.items)]
+    search = FakeSearch(args.search_latency)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory, SpotifyStandIn(args.api_latency) as stand_in:
+        stand_in.add_playlist('playlist', "Benchmark", items)
+        with stand_in_bot(stand_in, search, '', args.extraction_threads):
+            for concurrency in args.concurrency:
+                # A new index each time, so no matches are saved yet
+                await aquapod.track_index.close()
+                aquapod.track_index = aquapod.TrackIndex(path=os.path.join(directory, f'index-{concurrency}.db'), interval=0)
+                rows.append(await measure(stand_in, search, concurrency, "no"))
+            rows.append(await measure(stand_in, search, args.concurrency[-1], "all"))
+            await aquapod.track_index.close()
+    return rows
+
+
+async def measure(stand_in, search, concurrency, saved):
+    requests, searches = stand_in.requests, search.searches
+    fetch_seconds, match_seconds, matched = await import_playlist('playlist', concurrency)
+    total = fetch_seconds + match_seconds
+    return {
+        'concurrency': concurrency, 'saved_matches': saved, 'api_requests': stand_in.requests - requests,
+        'searches': search.searches - searches, 'matched': len(matched), 'fetch_s': fetch_seconds,
+        'match_s': match_seconds, 'items_per_s': len(matched) / total if total else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=500, help="Episodes in the playlist")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16], help="Match concurrencies to run")
+    parser.add_argument('--api-latency', type=float, default=0.15, help="Seconds each Spotify API request takes")
+    parser.add_argument('--search-latency', type=float, default=0.8, help="Seconds each YouTube search takes")
+    parser.add_argument('--extraction-threads', type=int, default=aquapod.EXTRACTION_THREADS, help="Extraction threads")
+    args = parser.parse_args()
+
+    logging.getLogger('discord').setLevel(logging.ERROR)
+    with contextlib.redirect_stdout(sys.stderr):
+        rows = asyncio.run(run(args))
+
+    print(f"{args.items} items, {args.api_latency * 1000:.0f}ms per API request, {args.search_latency * 1000:.0f}ms per search")
+    print(f"{'concurrency':<13}{'saved':>7}{'requests':>10}{'searches':>10}{'matched':>9}{'fetch s':>9}{'match s':>9}{'items/s':>10}")
+    for row in rows:
+        print(
+            f"{row['concurrency']:<13}{row['saved_matches']:>7}{row['api_requests']:>10}{row['searches']:>10}{row['matched']:>9}"
+            f"{row['fetch_s']:>9.2f}{row['match_s']:>9.2f}{row['items_per_s']:>10.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+
+from aquapod.main import AudioCache
+
+
+def write_partial(cache, video_id, size):
+    os.makedirs(cache.directory, exist_ok=True)
+    partial = cache.path_for(video_id) + '.part'
+    with open(partial, 'wb') as file:
+        file.write(b'\0' * size)
+    return partial
+
+
+def test_commit_lookup_and_lru_eviction(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=250)
+    for video_id in ['aaaaaaaaaaa', 'bbbbbbbbbbb']:
+        cache.commit(video_id, write_partial(cache, video_id, 100))
+    assert cache.lookup('aaaaaaaaaaa') == cache.path_for('aaaaaaaaaaa')  # Now the most recently used
+    assert cache.lookup('ccccccccccc') is None
+
+    cache.commit('ccccccccccc', write_partial(cache, 'ccccccccccc', 100))
+    assert list(cache.files) == ['aaaaaaaaaaa', 'ccccccccccc']
+    assert cache.total_bytes == 200
+    assert not os.path.exists(cache.path_for('bbbbbbbbbbb'))
+    assert cache.stats == {'hits': 1, 'misses': 1, 'stored': 3, 'evictions': 1, 'failures': 0}
+
+
+def test_scan_indexes_finished_files_and_drops_partial_ones(tmp_path):
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1000)
+    cache.commit('aaaaaaaaaaa', write_partial(cache, 'aaaaaaaaaaa', 100))
+    partial = write_partial(cache, 'bbbbbbbbbbb', 100)
+
+    restarted = AudioCache(directory=str(tmp_path), max_bytes=1000)
+    assert list(restarted.files) == ['aaaaaaaaaaa']
+    assert restarted.total_bytes == 100
+    assert not os.path.exists(partial)
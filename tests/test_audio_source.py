@@ -0,0 +1,28 @@
+from aquapod import main
+
+
+class FakeSource:
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+
+
+def test_opus_mode_copies_opus_and_transcodes_the_rest(monkeypatch):
+    monkeypatch.setattr(main.discord, 'FFmpegOpusAudio', FakeSource)
+    copied = main.create_audio_source({'url': '/cache/a.opus', 'acodec': 'opus'}, mode='opus')
+    transcoded = main.create_audio_source({'url': '/cache/b.m4a', 'acodec': 'mp4a.40.2'}, start_at=90, mode='opus')
+    assert copied.options['codec'] == 'copy' and copied.options['before_options'] is None
+    assert transcoded.options['codec'] == 'libopus' and transcoded.options['before_options'] == '-ss 90'
+
+
+def test_pcm_mode_decodes(monkeypatch):
+    monkeypatch.setattr(main.discord, 'FFmpegPCMAudio', FakeSource)
+    source = main.create_audio_source({'url': 'https://a', 'acodec': 'opus'}, mode='pcm')
+    assert isinstance(source, FakeSource) and 'codec' not in source.options
+
+
+def test_remote_streams_reconnect_with_settings_for_their_kind():
+    stream = main.ffmpeg_input_options({'url': 'https://rr1.googlevideo.com/videoplayback?expire=1'}, start_at=600)
+    live = main.ffmpeg_input_options({'url': 'https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1', 'is_live': True})
+    assert stream == f"{main.FFMPEG_STREAM_OPTIONS} -ss 600"
+    assert live == f"{main.FFMPEG_LIVE_OPTIONS} {main.FFMPEG_HLS_OPTIONS}"
@@ -0,0 +1,20 @@
+import asyncio
+from types import SimpleNamespace
+
+from aquapod import main
+from benchmarks import command_load
+
+
+def test_handlers_run_offline_against_the_fakes():
+    original_extraction = main.run_extraction
+    args = SimpleNamespace(
+        playlist_size=5, duration=1.5, track_seconds=0.3, skip_interval=0.5, extract_latency=0.01,
+        extract_cpu=0, page_latency=0, api_latency=0.001, extraction_threads=4
+    )
+    result = asyncio.run(command_load.run_scenario(args, 2))
+
+    assert result['playlists_loaded'] == 2
+    assert result['extractions']['video'] == 10
+    assert result['time_to_first_audio_ms']['p50'] is not None
+    assert result['queue_message_edits_per_minute'] > 0
+    assert main.run_extraction is original_extraction and not main.bot.guild_data
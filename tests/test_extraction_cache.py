@@ -0,0 +1,67 @@
+import asyncio
+
+from aquapod.main import ExtractionCache
+
+
+def make_info(video_id, expire=None):
+    url = f"https://rr1.googlevideo.com/videoplayback?expire={expire}&id={video_id}" if expire else None
+    return {'id': video_id, 'title': f"Episode {video_id}", 'url': url}
+
+
+def test_key_for_youtube_urls():
+    assert ExtractionCache.key_for("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=abc") == "dQw4w9WgXcQ"
+    assert ExtractionCache.key_for("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert ExtractionCache.key_for("https://example.com/episode.mp3") == "https://example.com/episode.mp3"
+
+
+def test_stream_expiry_from_query_and_path():
+    assert ExtractionCache.stream_expiry("https://x.googlevideo.com/videoplayback?expire=1700000000&ei=1", 0) == 1700000000
+    assert ExtractionCache.stream_expiry("https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1700000000/ei/1", 0) == 1700000000
+
+
+def test_hits_and_stream_expiry():
+    async def run():
+        cache = ExtractionCache(max_entries=10, metadata_ttl=3600)
+        calls = []
+
+        async def extract():
+            calls.append(1)
+            return make_info('aaaaaaaaaaa', expire=1)  # Stream URL already expired
+
+        url = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+        await cache.get(url, extract)
+        await cache.get(url, extract)
+        assert len(calls) == 1
+        await cache.get(url, extract, need_stream=True)
+        assert len(calls) == 2
+        assert cache.stats['hits'] == 1 and cache.stats['misses'] == 2
+
+    asyncio.run(run())
+
+
+def test_concurrent_lookups_share_one_extraction():
+    async def run():
+        cache = ExtractionCache()
+        calls = []
+
+        async def extract():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return make_info('bbbbbbbbbbb')
+
+        results = await asyncio.gather(*(cache.get("https://youtu.be/bbbbbbbbbbb", extract) for _ in range(5)))
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert cache.stats['deduplicated'] == 4
+
+    asyncio.run(run())
+
+
+def test_lru_eviction():
+    cache = ExtractionCache(max_entries=2)
+    for video_id in ['ccccccccccc', 'ddddddddddd']:
+        cache.put(video_id, make_info(video_id))
+    cache.entries.move_to_end('ccccccccccc')  # Most recently used
+    cache.put('eeeeeeeeeee', make_info('eeeeeeeeeee'))
+    assert list(cache.entries) == ['ccccccccccc', 'eeeeeeeeeee']
+    assert cache.stats['evictions'] == 1
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+
+from aquapod import main
+from aquapod.main import ExtractionCancelled, ExtractionScheduler
+
+
+def test_priority_then_round_robin_across_guilds():
+    async def run():
+        scheduler = ExtractionScheduler(concurrency=1)
+        gate = threading.Event()
+        order = []
+
+        def job(name):
+            gate.wait()
+            order.append(name)
+
+        blocker = asyncio.create_task(scheduler.run(0, ExtractionScheduler.NOW, job, 'blocker'))
+        await asyncio.sleep(0)
+        jobs = [scheduler.run(1, ExtractionScheduler.BACKFILL, job, f'a{idx}') for idx in range(3)]
+        jobs.append(scheduler.run(2, ExtractionScheduler.BACKFILL, job, 'b0'))
+        jobs.append(scheduler.run(3, ExtractionScheduler.INTERACTIVE, job, 'play'))
+        jobs = [asyncio.create_task(pending) for pending in jobs]
+        await asyncio.sleep(0)
+        assert scheduler.depth(1) == 3
+        gate.set()
+        await asyncio.gather(blocker, *jobs)
+        assert order == ['blocker', 'play', 'a0', 'b0', 'a1', 'a2']
+
+    asyncio.run(run())
+
+
+def test_cancel_drops_waiting_jobs():
+    async def run():
+        scheduler = ExtractionScheduler(concurrency=1)
+        gate = threading.Event()
+        running = asyncio.create_task(scheduler.run(1, ExtractionScheduler.BACKFILL, gate.wait))
+        waiting = asyncio.create_task(scheduler.run(1, ExtractionScheduler.BACKFILL, gate.wait))
+        await asyncio.sleep(0)
+        assert scheduler.cancel(1) == 1
+        with pytest.raises(ExtractionCancelled):
+            await waiting
+        gate.set()
+        assert await running is True
+        assert scheduler.stats_for(1)['cancelled'] == 1
+
+    asyncio.run(run())
+
+
+def test_cancel_keeps_jobs_another_guild_waits_on(monkeypatch):
+    async def run():
+        scheduler = ExtractionScheduler(concurrency=1)
+        cache = main.ExtractionCache()
+        monkeypatch.setattr(main, 'extraction_scheduler', scheduler)
+        monkeypatch.setattr(main, 'extraction_cache', cache)
+        gate = threading.Event()
+        monkeypatch.setattr(main, 'run_extraction', lambda kind, url: gate.wait() and {'id': url[-11:], 'title': "Shared"})
+
+        blocker = asyncio.create_task(scheduler.run(0, ExtractionScheduler.NOW, gate.wait))
+        url = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+        first = asyncio.create_task(main.extract_video_info_async(url, guild_id=1))
+        second = asyncio.create_task(main.extract_video_info_async(url, guild_id=2))
+        await asyncio.sleep(0)
+        assert scheduler.cancel(1) == 0 and scheduler.depth(2) == 1
+        gate.set()
+        await blocker
+        assert (await second)['title'] == "Shared"
+        assert (await first)['title'] == "Shared"
+
+    asyncio.run(run())
@@ -0,0 +1,25 @@
+from aquapod import main
+
+
+class FakeYoutubeDL:
+    def __init__(self, info):
+        self.info = info
+
+    def extract_info(self, url, download):
+        return self.info
+
+
+def test_playlist_is_slimmed_to_entry_urls(monkeypatch):
+    info = {'title': "Feed", 'uploader': "Someone", 'entries': [{'url': "https://youtu.be/a", 'title': "A", 'thumbnails': [{}] * 10}, None]}
+    monkeypatch.setitem(main.downloaders, 'playlist', FakeYoutubeDL(info))
+    assert main.run_extraction('playlist', "https://youtube.com/playlist?list=x") == {
+        'title': "Feed",
+        'entries': [{'url': "https://youtu.be/a", 'title': "A"}, None]
+    }
+
+
+def test_single_video_from_playlist_extraction_is_slimmed(monkeypatch):
+    info = {'id': "a", 'title': "A", 'url': "https://rr1.googlevideo.com/a", 'acodec': "opus", 'formats': [{}] * 50}
+    monkeypatch.setitem(main.downloaders, 'playlist', FakeYoutubeDL(info))
+    slimmed = main.run_extraction('playlist', "https://youtu.be/a")
+    assert 'formats' not in slimmed and slimmed['acodec'] == "opus"
@@ -0,0 +1,32 @@
+import asyncio
+
+from aquapod import launcher, main
+
+
+def test_shards_are_split_evenly_across_processes():
+    assert launcher.shard_ranges(10, 4) == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]]
+    env = launcher.process_env(1, [3, 4, 5], 10, 4, '127.0.0.1:9000', {'AUDIO_CACHE_DIR': 'cache', 'AUDIO_CACHE_MAX_MB': '2000'})
+    assert env['SHARD_IDS'] == '3,4,5' and env['SHARD_COUNT'] == '10' and env['SHARD_PROCESS'] == '1'
+    assert env['AUDIO_CACHE_DIR'].endswith('process-1') and env['AUDIO_CACHE_MAX_MB'] == '500'
+
+
+def test_processes_report_to_the_launcher_and_receive_totals():
+    async def run():
+        coordinator = launcher.Coordinator(processes=2, interval=0.01, stale_after=1)
+        address = await coordinator.start()
+        broadcast = asyncio.create_task(coordinator.broadcast())
+        link = main.ShardLink(address, interval=0.01)
+        link.task = asyncio.create_task(link.run())
+        for _ in range(100):
+            if link.totals:
+                break
+            await asyncio.sleep(0.01)
+        link.task.cancel()
+        broadcast.cancel()
+        coordinator.server.close()
+
+        assert link.totals['processes'] == 2 and link.totals['reporting'] == 1
+        assert link.totals['guild_states'] == len(main.bot.guild_data)
+        assert coordinator.reports[0][1]['ready'] is False
+
+    asyncio.run(run())
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+from aquapod import main
+
+
+def test_histogram_renders_cumulative_buckets(monkeypatch):
+    monkeypatch.setattr(main, 'metrics', [])
+    histogram = main.Histogram('test_seconds', "Test latency", labels=('kind',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, 'video')
+    counter = main.Counter('test_total', "Test count", labels=('scope',))
+    counter.inc('global')
+    main.Collected('test_guilds', "Test gauge", lambda: {(1,): 4}, labels=('guild',))
+
+    lines = main.render_metrics().splitlines()
+    assert '# TYPE test_seconds histogram' in lines
+    assert 'test_seconds_bucket{kind="video",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{kind="video",le="1"} 3' in lines
+    assert 'test_seconds_bucket{kind="video",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{kind="video"} 4' in lines
+    assert 'test_total{scope="global"} 1' in lines
+    assert 'test_guilds{guild="1"} 4' in lines
+
+
+def test_rate_limits_are_counted_from_discord_logs():
+    before = main.rate_limits.values.get(('route',), 0)
+    logging.getLogger('discord.http').warning('We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.', 'PATCH', '/x', 1.0)
+    assert main.rate_limits.values[('route',)] == before + 1
+
+    response = asyncio.run(main.serve_metrics(None))
+    assert 'aquapod_discord_rate_limits_total{scope="route"}' in response.text
+    assert '# TYPE aquapod_voice_sessions gauge' in response.text
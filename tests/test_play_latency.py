@@ -0,0 +1,17 @@
+from aquapod.main import is_single_video_url, percentile
+
+
+def test_single_video_links_skip_playlist_extraction():
+    assert is_single_video_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    assert is_single_video_url("https://youtu.be/dQw4w9WgXcQ?t=30")
+    assert not is_single_video_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123")
+    assert not is_single_video_url("https://www.youtube.com/playlist?list=PL123")
+    assert not is_single_video_url("https://www.youtube.com/@channel/videos")
+
+
+def test_percentile():
+    values = [float(idx) for idx in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.95) == 96.0
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([], 0.5) is None
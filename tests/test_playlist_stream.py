@@ -0,0 +1,72 @@
+import asyncio
+
+from aquapod import main
+
+
+def fake_youtube_dl(produced, count):
+    class FakeYoutubeDL:
+        def __init__(self, options):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download, process):
+            def entries():
+                for idx in range(count):
+                    produced.append(idx)
+                    yield {'url': f"https://youtu.be/{idx:011d}", 'title': f"Episode {idx}"}
+            return {'title': "Feed", 'entries': entries()}
+
+    return FakeYoutubeDL
+
+
+def test_pages_are_read_only_as_fast_as_they_are_taken(monkeypatch):
+    produced = []
+    monkeypatch.setattr(main.yt_dlp, 'YoutubeDL', fake_youtube_dl(produced, 1000))
+
+    async def run():
+        stream = main.PlaylistStream("https://youtube.com/playlist?list=x", page_size=10)
+        assert await stream.start()
+        assert stream.title == "Feed"
+        first = await stream.__anext__()
+        assert [entry['title'] for entry in first] == [f"Episode {idx}" for idx in range(10)]
+        await asyncio.sleep(0.1)
+        # One page waiting to be taken and one being built, nowhere near the whole playlist
+        assert len(produced) <= 31
+        stream.close()
+
+    asyncio.run(run())
+
+
+def test_loading_pauses_while_the_window_is_full(monkeypatch):
+    monkeypatch.setattr(main.yt_dlp, 'YoutubeDL', fake_youtube_dl([], 100))
+
+    async def run():
+        guild_data = main.GuildState(guild_id=1)
+
+        async def resolve(entries, on_resolved, guild_id):
+            for entry in entries:
+                await on_resolved(entry['url'], {'title': entry['title']})
+            return len(entries)
+
+        async def queue_entry(video_url, video_info):
+            guild_data.pod_queue.append(main.Track.from_info(video_info, video_url))
+
+        monkeypatch.setattr(main, 'resolve_playlist_async', resolve)
+        stream = main.PlaylistStream("https://youtube.com/playlist?list=x", page_size=10)
+        await stream.start()
+        load = asyncio.create_task(main.load_playlist_stream(stream, guild_data, queue_entry, window=20))
+        await asyncio.sleep(0.1)
+        assert len(guild_data.pod_queue) == 20 and not load.done()
+
+        while not load.done():
+            guild_data.pod_queue.popleft()
+            guild_data.queue_space.set()
+            await asyncio.sleep(0.01)
+        assert await load == 100
+
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+import asyncio
+
+from aquapod import main
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, content):
+        self.edits.append(content)
+
+
+class FakeChannel:
+    async def send(self, content, view):
+        return FakeMessage()
+
+
+def test_bursts_are_coalesced_and_unchanged_content_skipped(monkeypatch):
+    async def run():
+        guild_data = main.bot.get_guild_data(1)
+        guild_data.assigned_channel_id = 10
+        guild_data.queue_message = FakeMessage()
+        monkeypatch.setattr(main.bot, 'get_channel', lambda channel_id: FakeChannel())
+
+        renderer = main.QueueRenderer(1, interval=0.05)
+        for idx in range(50):
+            guild_data.pod_queue.append(main.Track(name=f"Episode {idx}", url=f"https://youtu.be/{idx}"))
+            renderer.mark_dirty()
+        await renderer.task
+        assert len(guild_data.queue_message.edits) == 1
+        assert "...and 45 more." in guild_data.queue_message.edits[0]
+
+        renderer.mark_dirty()
+        await renderer.task
+        assert len(guild_data.queue_message.edits) == 1
+
+    asyncio.run(run())
+    main.bot.guild_data.clear()
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from aquapod import main
+
+
+class FakeMember:
+    def __init__(self, bot):
+        self.bot = bot
+
+
+class FakeVoiceClient:
+    def __init__(self, members, playing):
+        self.channel = type('Channel', (), {'members': members})()
+        self.playing = playing
+        self.disconnected = False
+
+    def is_playing(self):
+        return self.playing
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def test_queue_cap_only_limits_new_tracks():
+    queue = main.TrackQueue(max_length=2)
+    queue.append(main.Track(name="A", url="a"))
+    queue.append(main.Track(name="B", url="b"))
+    with pytest.raises(main.QueueFull):
+        queue.append(main.Track(name="C", url="c"))
+    queue.appendleft(main.Track(name="Current", url="current"))
+    assert [track.name for track in queue] == ["Current", "A", "B"]
+    assert len(main.Track.from_info({'title': "x" * 1000}, "url").name) == main.MAX_TITLE_LENGTH
+
+
+def test_voice_is_idle_when_alone_or_not_playing():
+    listener, bot_member = FakeMember(bot=False), FakeMember(bot=True)
+    assert main.voice_idle_reason(FakeVoiceClient([listener, bot_member], playing=True)) is None
+    assert main.voice_idle_reason(FakeVoiceClient([listener], playing=False)) == ('idle', main.VOICE_IDLE_TIMEOUT)
+    assert main.voice_idle_reason(FakeVoiceClient([bot_member], playing=True)) == ('alone', main.VOICE_ALONE_TIMEOUT)
+
+
+def test_leaving_voice_keeps_the_current_track_queued(monkeypatch):
+    async def run():
+        monkeypatch.setattr(main, 'state_store', main.StateStore(path=''))
+        monkeypatch.setattr(main.bot, 'guild_data', {})
+        guild_data = main.bot.get_guild_data(1)
+        guild_data.current_pod = main.Track(name="Episode", url="https://youtu.be/aaaaaaaaaaa", duration=3600)
+        guild_data.audio = type('Audio', (), {'position': 1200.0, 'interrupted': False})()
+        guild = type('Guild', (), {'id': 1, 'voice_client': FakeVoiceClient([], playing=True)})()
+
+        await main.leave_voice(guild)
+        assert guild.voice_client.disconnected
+        assert guild_data.current_pod is None and guild_data.audio is None
+        assert guild_data.pod_queue[0].name == "Episode"
+        assert guild_data.pod_queue[0].start_at == 1200.0 - main.RESUME_REWIND_SECONDS
+
+    asyncio.run(run())
+
+
+def test_only_cold_saved_guilds_are_evicted(monkeypatch):
+    async def run():
+        store = main.StateStore(path="unused.db")
+        monkeypatch.setattr(main, 'state_store', store)
+        monkeypatch.setattr(main.bot, 'guild_data', {})
+        for guild_id in (1, 2, 3, 4):
+            main.bot.get_guild_data(guild_id).last_active = 0
+        main.bot.guild_data[2].current_pod = main.Track(name="Playing", url="a")
+        main.bot.guild_data[3].last_active = main.GUILD_STATE_TTL
+        store.dirty.add(4)
+
+        assert main.evict_cold_guilds(now=main.GUILD_STATE_TTL + 1) == 1
+        assert sorted(main.bot.guild_data) == [2, 3, 4]
+
+    asyncio.run(run())
@@ -0,0 +1,63 @@
+import asyncio
+
+from aquapod import main
+from benchmarks.spotify_import import FakeSearch, SpotifyStandIn, episode, spotify_id, stand_in_bot
+
+
+def test_spotify_links_are_recognised():
+    show = spotify_id('show', 1)
+    assert main.parse_spotify_link(f"https://open.spotify.com/show/{show}?si=abc") == ('show', show)
+    assert main.parse_spotify_link(f"https://open.spotify.com/intl-de/episode/{show}") == ('episode', show)
+    assert main.parse_spotify_link(f"spotify:playlist:{show}") == ('playlist', show)
+    assert main.parse_spotify_link("https://www.youtube.com/watch?v=aaaaaaaaaaa") is None
+
+
+def test_pages_are_fetched_at_the_largest_size():
+    async def run():
+        with SpotifyStandIn() as stand_in:
+            episodes = [episode("History Show", idx) for idx in range(120)]
+            stand_in.add_show('show', "History Show", episodes)
+            stand_in.add_playlist('playlist', "Mixed", [*episodes[:200], None, {'type': 'track', 'id': None, 'name': "Local file"}])
+            stand_in.add_playlist('long', "Long", episodes * 2)
+            main.spotify, original = stand_in.client(), main.spotify
+            try:
+                title, items = await main.fetch_spotify_items('show', 'show')
+                assert title == "History Show" and stand_in.requests == 3
+                assert [item['name'] for item in items] == [f"Episode {idx}" for idx in range(120)]
+                assert items[0] == {'id': spotify_id('ep', 0), 'name': "Episode 0", 'creator': "History Show", 'duration': 1800}
+
+                title, items = await main.fetch_spotify_items('playlist', 'long')
+                assert title == "Long" and len(items) == 240 and stand_in.requests == 6
+
+                _, items = await main.fetch_spotify_items('playlist', 'playlist')
+                assert len(items) == 120
+
+                title, items = await main.fetch_spotify_items('episode', spotify_id('ep', 7))
+                assert title == "Episode 7" and items[0]['creator'] == "History Show"
+            finally:
+                main.spotify = original
+
+    asyncio.run(run())
+
+
+def test_matches_are_saved_so_a_reimport_needs_no_searches(tmp_path):
+    async def run():
+        search = FakeSearch(latency=0)
+        items = [main.spotify_item(episode("Show", idx)) for idx in range(30)]
+        with SpotifyStandIn() as stand_in, stand_in_bot(stand_in, search, str(tmp_path / 'index.db'), 4):
+            first, second = [], []
+
+            async def keep(into, video_url, video_info):
+                into.append((video_url, video_info['duration']))
+
+            assert await main.resolve_spotify_items(items, lambda *args: keep(first, *args), concurrency=4) == 30
+            await main.track_index.flush()
+            assert search.searches == 30
+            # The top result is a clip; the result as long as the episode is chosen
+            assert all(duration == 1804 for _, duration in first)
+
+            assert await main.resolve_spotify_items(items, lambda *args: keep(second, *args)) == 30
+            assert search.searches == 30 and second == first
+            await main.track_index.close()
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import asyncio
+
+from aquapod import main
+
+
+class FakeAudio:
+    position = 1800.0
+
+
+def test_state_round_trip_and_resume(tmp_path, monkeypatch):
+    async def run():
+        store = main.StateStore(path=str(tmp_path / "state.db"), interval=0.01)
+        guild_data = main.bot.get_guild_data(1)
+        guild_data.assigned_channel_id = 10
+        guild_data.current_pod = main.Track(name="Long episode", url="https://youtu.be/aaaaaaaaaaa", id="aaaaaaaaaaa", duration=7200)
+        guild_data.audio = FakeAudio()
+        for idx in range(3):
+            guild_data.pod_queue.append(main.Track(name=f"Episode {idx}", url=f"https://youtu.be/{idx}"))
+            store.mark_dirty(1)
+        await store.task
+        assert store.stats['flushes'] == 1
+
+        FakeAudio.position = 2400.0
+        store.mark_position(1)
+        await store.task
+        saved = await store.load(1)
+        await store.close()
+
+        assert saved['assigned_channel_id'] == 10
+        assert saved['position'] == 2400.0
+        assert saved['current'].name == "Long episode"
+        assert [track.name for track in saved['queue']] == ["Episode 0", "Episode 1", "Episode 2"]
+
+        main.bot.guild_data.clear()
+        monkeypatch.setattr(main, 'state_store', store)
+        await main.restore_guild_state(1)
+        restored = main.bot.get_guild_data(1)
+        assert restored.current_pod is None
+        assert [track.name for track in restored.pod_queue] == ["Long episode", "Episode 0", "Episode 1", "Episode 2"]
+        assert restored.pod_queue[0].start_at == 2400.0 - main.RESUME_REWIND_SECONDS
+        await store.close()
+
+    asyncio.run(run())
+    main.bot.guild_data.clear()
+
+
+def test_missing_guild_loads_nothing(tmp_path):
+    async def run():
+        store = main.StateStore(path=str(tmp_path / "state.db"))
+        assert await store.load(42) is None
+        await store.close()
+
+    asyncio.run(run())
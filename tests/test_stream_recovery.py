@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+from aquapod import main
+
+
+class FakeAudio:
+    def __init__(self, position):
+        self.position = position
+        self.interrupted = False
+
+
+def test_ended_early():
+    pod = main.Track(name="Episode", url="https://youtu.be/aaaaaaaaaaa", duration=3600)
+    assert main.ended_early(pod, FakeAudio(1200), None)
+    assert not main.ended_early(pod, FakeAudio(3595), None)
+    assert main.ended_early(pod, FakeAudio(3595), Exception("broken pipe"))
+    skipped = FakeAudio(1200)
+    skipped.interrupted = True
+    assert not main.ended_early(pod, skipped, None)
+
+
+def test_dropped_stream_resumes_at_its_position_within_the_retry_budget(monkeypatch):
+    async def run():
+        interaction = SimpleNamespace(guild=SimpleNamespace(id=5))
+        guild_data = main.bot.get_guild_data(5)
+        pod = main.Track(name="Episode", url="https://youtu.be/aaaaaaaaaaa", duration=3600)
+        guild_data.current_pod = pod
+        calls = []
+
+        async def extract_stream(url, guild_id):
+            return {'url': 'https://rr1.googlevideo.com/videoplayback?expire=1'}
+
+        async def play_podcast(interaction, recovering_since):
+            calls.append(('resume', pod.start_at))
+
+        async def play_next(interaction, ended_at):
+            calls.append(('next', None))
+
+        monkeypatch.setattr(main, 'extract_stream_async', extract_stream)
+        monkeypatch.setattr(main, 'play_podcast', play_podcast)
+        monkeypatch.setattr(main, 'play_next', play_next)
+        monkeypatch.setattr(main, 'STREAM_RETRY_LIMIT', 1)
+
+        await main.track_ended(interaction, pod, FakeAudio(1234.5), None, 0.0)
+        assert calls == [('resume', 1234.5)]
+        await main.track_ended(interaction, pod, FakeAudio(1300), None, 0.0)
+        assert calls[-1] == ('next', None)
+        assert main.recovery_stats['gave_up'] >= 1
+
+    asyncio.run(run())
+    main.bot.guild_data.clear()
@@ -0,0 +1,59 @@
+import asyncio
+
+from aquapod import main
+
+
+def video(video_id, title, channel, duration=1800):
+    return {'id': video_id, 'title': title, 'channel': channel, 'duration': duration, 'url': 'https://stream'}
+
+
+def test_search_matches_prefixes_and_prefers_played_tracks(tmp_path):
+    async def run():
+        index = main.TrackIndex(path=str(tmp_path / 'index.db'), interval=0)
+        index.add_video(video('aaaaaaaaaaa', "Hardcore History 70 - Supernova in the East", "Dan Carlin"))
+        index.add_video(video('bbbbbbbbbbb', "Hardcore History 71 - Mania for Subjugation", "Dan Carlin"))
+        index.add_video(video('ccccccccccc', "Café Économique", "Planet Money"))
+        index.add_video({'id': 'ddddddddddd', 'title': "Live radio", 'is_live': True})
+        index.played('bbbbbbbbbbb')
+        await index.flush()
+
+        assert index.stats['indexed'] == 3
+        assert [entry['title'] for entry in await index.search("hardcore hist")][0].endswith("Subjugation")
+        assert [entry['title'] for entry in await index.search("dan carlin supernova")] == ["Hardcore History 70 - Supernova in the East"]
+        assert (await index.search("cafe econ"))[0]['url'] == "https://www.youtube.com/watch?v=ccccccccccc"
+        assert await index.search("radio") == []
+        assert (await index.search(""))[0]['plays'] == 1
+        await index.close()
+
+    asyncio.run(run())
+
+
+def test_free_text_prefers_the_index_over_youtube(monkeypatch, tmp_path):
+    async def run():
+        index = main.TrackIndex(path=str(tmp_path / 'index.db'), interval=0)
+        monkeypatch.setattr(main, 'track_index', index)
+        searched = []
+
+        async def search_youtube(guild_id, priority, function, kind, query):
+            searched.append(query)
+            return {'entries': [{'url': "https://www.youtube.com/watch?v=eeeeeeeeeee"}]}
+
+        monkeypatch.setattr(main.extraction_scheduler, 'run', search_youtube)
+        assert await main.resolve_search("planet money") == "https://www.youtube.com/watch?v=eeeeeeeeeee"
+        assert searched == ["ytsearch1:planet money"]
+
+        index.add_video(video('ccccccccccc', "Café Économique", "Planet Money"))
+        await index.flush()
+        assert await main.resolve_search("planet money") == "https://www.youtube.com/watch?v=ccccccccccc"
+        assert len(searched) == 1
+        await index.close()
+
+    asyncio.run(run())
+
+
+def test_choice_labels_fit_discord_limits():
+    entry = {'kind': 'video', 'title': "x" * 200, 'channel': "Channel", 'duration': 3723}
+    label = main.describe_choice(entry)
+    assert len(label) == 100 and label.endswith(" - Channel (1:02:03)")
+    assert main.describe_choice({'kind': 'playlist', 'title': "Season 1", 'channel': None, 'duration': None}) == "Playlist: Season 1"
+    assert main.is_url("https://youtu.be/aaaaaaaaaaa") and not main.is_url("hardcore history")
@@ -0,0 +1,36 @@
+from aquapod.main import Track, TrackQueue
+
+
+def make_queue(*ids):
+    return TrackQueue(Track(name=f"Episode {video_id}", url=f"https://youtu.be/{video_id}", id=video_id) for video_id in ids)
+
+
+def names(queue):
+    return [track.id for track in queue]
+
+
+def test_popleft_and_peek():
+    queue = make_queue('a', 'b', 'c')
+    assert [track.id for track in queue.peek(2)] == ['a', 'b']
+    assert queue.popleft().id == 'a'
+    assert names(queue) == ['b', 'c']
+    assert queue.peek(10)[-1].id == 'c'
+
+
+def test_remove_and_move():
+    queue = make_queue('a', 'b', 'c', 'd')
+    assert queue.remove(1).id == 'b'
+    assert queue.move(2, 0).id == 'd'
+    assert names(queue) == ['d', 'a', 'c']
+
+
+def test_dedupe_keeps_first_occurrence():
+    queue = make_queue('a', 'b', 'a', 'c', 'b')
+    assert queue.dedupe() == 2
+    assert names(queue) == ['a', 'b', 'c']
+
+
+def test_shuffle_keeps_tracks():
+    queue = make_queue(*map(str, range(50)))
+    queue.shuffle()
+    assert sorted(names(queue)) == sorted(map(str, range(50)))